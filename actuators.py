@@ -0,0 +1,219 @@
+import collections
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Buzzer patterns are sequences of (on seconds, off seconds) steps.
+STARTUP_PATTERN = ((2.0, 0.0),)
+
+NOTIFICATION_COMMANDS = {
+    'start': 's',
+    'notify': 'n',
+}
+
+_STOP = object()
+
+
+class GPIOBuzzer:
+    def __init__(self, pin):
+        self.pin = pin
+        self.GPIO = None
+
+    def open(self):
+        # Imported here so the mock backends work without RPi.GPIO.
+        import RPi.GPIO as GPIO
+        GPIO.setwarnings(False)
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(self.pin, GPIO.OUT)
+        self.GPIO = GPIO
+
+    def set(self, on):
+        self.GPIO.output(self.pin, self.GPIO.HIGH if on else self.GPIO.LOW)
+
+    def close(self):
+        if self.GPIO is not None:
+            self.GPIO.cleanup()
+
+
+class BinNotificationSystem:
+    def __init__(self, port, baud_rate):
+        self.port = port
+        self.baud_rate = baud_rate
+        self.serial_connection = None
+
+    def open(self):
+        from serial import Serial
+        self.serial_connection = Serial(self.port, self.baud_rate, timeout=1, write_timeout=1)
+        # The bin's Arduino resets when the port opens.
+        time.sleep(2)
+
+    def send_notification(self, action):
+        if action in NOTIFICATION_COMMANDS:
+            self.serial_connection.write(NOTIFICATION_COMMANDS[action].encode())
+
+    def close(self):
+        if self.serial_connection is not None:
+            self.serial_connection.close()
+
+
+class MockBuzzer:
+    # Records (monotonic time, state) instead of driving a pin.
+    def __init__(self):
+        self.events = []
+
+    def open(self):
+        pass
+
+    def set(self, on):
+        self.events.append((time.monotonic(), on))
+        logger.debug(f"Mock buzzer {'on' if on else 'off'}.")
+
+    def close(self):
+        pass
+
+
+class MockBinNotification:
+    def __init__(self):
+        self.sent = []
+
+    def open(self):
+        pass
+
+    def send_notification(self, action):
+        if action in NOTIFICATION_COMMANDS:
+            self.sent.append(action)
+            logger.debug(f"Mock bin notification '{action}'.")
+
+    def close(self):
+        pass
+
+
+class ActuatorScheduler(threading.Thread):
+    # Owns the buzzer and the bin link. Callers only enqueue commands, so
+    # alerting never blocks the acquisition or logging threads; buzzer
+    # patterns run from a timer heap on this thread instead of sleeping.
+    # Repeats of a command within `debounce` seconds are dropped, and each
+    # command runs at most `rate_limit` times per `rate_window` seconds.
+    def __init__(self, buzzer, notifier, debounce=1.0, rate_limit=6, rate_window=60.0, max_pending=64):
+        super(ActuatorScheduler, self).__init__(daemon=True)
+        self.buzzer = buzzer
+        self.notifier = notifier
+        self.debounce = debounce
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.commands = queue.Queue(max_pending)
+        self.timers = []
+        self.order = itertools.count()
+        self.generation = 0
+        self.buzzing = False
+        self.lastRun = {}
+        self.history = collections.defaultdict(collections.deque)
+        self.stats = {"commands": 0, "debounced": 0, "rate_limited": 0, "dropped": 0, "errors": 0}
+
+    def buzz(self, name, pattern):
+        self.submit("buzz", name, tuple(pattern))
+
+    def notify(self, action):
+        self.submit("notify", action, action)
+
+    def configure(self, debounce, rate_limit, rate_window):
+        # Applied on this thread, between commands.
+        self.submit("configure", "limits", (debounce, rate_limit, rate_window))
+
+    def submit(self, kind, name, payload):
+        try:
+            self.commands.put_nowait((kind, name, payload))
+        except queue.Full:
+            self.stats["dropped"] += 1
+            logger.warning(f"Actuator queue full, dropping {kind} '{name}'.")
+
+    def stop(self):
+        self.commands.put(_STOP)
+        self.join()
+
+    def run(self):
+        for device in (self.buzzer, self.notifier):
+            try:
+                device.open()
+            except Exception as e:
+                logger.error(f"Failed to open {type(device).__name__}: {e}")
+
+        while True:
+            timeout = max(0.0, self.timers[0][0] - time.monotonic()) if self.timers else None
+            try:
+                command = self.commands.get(timeout=timeout)
+            except queue.Empty:
+                command = None
+            if command is _STOP:
+                break
+            if command is not None:
+                self.handle(*command)
+            self.fireDue()
+
+        self.setBuzzer(False)
+        for device in (self.buzzer, self.notifier):
+            try:
+                device.close()
+            except Exception as e:
+                logger.error(f"Failed to close {type(device).__name__}: {e}")
+
+    def allowed(self, key, now):
+        last = self.lastRun.get(key)
+        if last is not None and now - last < self.debounce:
+            self.stats["debounced"] += 1
+            return False
+        history = self.history[key]
+        while history and now - history[0] >= self.rate_window:
+            history.popleft()
+        if len(history) >= self.rate_limit:
+            self.stats["rate_limited"] += 1
+            return False
+        self.lastRun[key] = now
+        history.append(now)
+        return True
+
+    def handle(self, kind, name, payload):
+        if kind == "configure":
+            self.debounce, self.rate_limit, self.rate_window = payload
+            return
+        now = time.monotonic()
+        if not self.allowed((kind, name), now):
+            return
+        self.stats["commands"] += 1
+        if kind == "buzz":
+            # A new pattern replaces whatever is still playing.
+            self.generation += 1
+            due = now
+            for on, off in payload:
+                heapq.heappush(self.timers, (due, next(self.order), self.generation, True))
+                due += on
+                heapq.heappush(self.timers, (due, next(self.order), self.generation, False))
+                due += off
+        else:
+            try:
+                self.notifier.send_notification(payload)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Failed to send bin notification '{payload}': {e}")
+
+    def fireDue(self):
+        now = time.monotonic()
+        while self.timers and self.timers[0][0] <= now:
+            _, _, generation, on = heapq.heappop(self.timers)
+            if generation == self.generation:
+                self.setBuzzer(on)
+
+    def setBuzzer(self, on):
+        if on == self.buzzing:
+            return
+        try:
+            self.buzzer.set(on)
+            self.buzzing = on
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Failed to switch buzzer {'on' if on else 'off'}: {e}")
@@ -0,0 +1,82 @@
+import time
+
+import numpy as np
+
+from frame_decode import PIXEL_COUNT
+
+
+class AdaptiveRateController:
+    # Chooses a sensor refresh rate from the scene, as a FrameStore
+    # listener. `rates` is ascending; the top rate is used once a pixel
+    # reaches the threshold, the one below it within `margin` degrees of
+    # it, `normal` while something moves and the bottom rate for a quiet
+    # scene. Something moves when at least `motion_pixels` pixels change by
+    # more than `motion` degrees over `motion_window` seconds; comparing
+    # frames a fixed time apart keeps the test the same at every rate, and
+    # needing several pixels keeps noise and dead pixels out of it.
+    # Stepping up is immediate, so detection latency only suffers for the
+    # first frame; stepping down goes one rate at a time, each after `hold`
+    # seconds without a reason for the faster rate, and the temperature
+    # tests get `hysteresis` degrees of slack on the way down.
+    def __init__(self, threshold, rates=(2, 8, 16, 32), normal=8, margin=1.0, hysteresis=0.3, motion=1.0,
+                 motion_pixels=4, motion_window=0.5, hold=10.0, pixels=PIXEL_COUNT):
+        rates = sorted(rates)
+        if len(rates) < 3 or normal not in rates or normal == rates[-1]:
+            raise ValueError("rates needs at least three entries with normal below the top one")
+        self.threshold = threshold
+        self.rates = rates
+        self.normalLevel = rates.index(normal)
+        self.margin = margin
+        self.hysteresis = hysteresis
+        self.motion = motion
+        self.motion_pixels = motion_pixels
+        self.motion_window = motion_window
+        self.hold = hold
+        self.level = self.normalLevel
+        self.holdUntil = None
+        self.reference = np.zeros(pixels, dtype=np.float32)
+        self.referenceTime = None
+        self.change = np.zeros(pixels, dtype=np.float32)
+        self.moving = False
+        self.stats = {"up": 0, "down": 0}
+
+    @property
+    def rate(self):
+        return self.rates[self.level]
+
+    def wanted(self, snapshot, now):
+        top = len(self.rates) - 1
+        # Slack for leaving a level we are already at or above.
+        slack = self.hysteresis if self.level >= top else 0
+        if snapshot.maxHet >= self.threshold - slack:
+            return top
+        slack = self.hysteresis if self.level >= top - 1 else 0
+        if snapshot.maxHet >= self.threshold - self.margin - slack:
+            return top - 1
+
+        if self.referenceTime is None or now - self.referenceTime >= self.motion_window:
+            frame = snapshot.raw if snapshot.raw is not None else snapshot.frame
+            if self.referenceTime is not None:
+                np.subtract(frame, self.reference, out=self.change)
+                np.abs(self.change, out=self.change)
+                self.moving = np.count_nonzero(self.change > self.motion) >= self.motion_pixels
+            np.copyto(self.reference, frame)
+            self.referenceTime = now
+        return self.normalLevel if self.moving else 0
+
+    def process(self, snapshot, now=None):
+        if not snapshot:
+            return
+        now = time.monotonic() if now is None else now
+        if self.holdUntil is None:
+            self.holdUntil = now + self.hold
+        wanted = self.wanted(snapshot, now)
+        if wanted >= self.level:
+            if wanted > self.level:
+                self.level = wanted
+                self.stats["up"] += 1
+            self.holdUntil = now + self.hold
+        elif now >= self.holdUntil:
+            self.level -= 1
+            self.stats["down"] += 1
+            self.holdUntil = now + self.hold
@@ -0,0 +1,279 @@
+import asyncio
+import collections
+import io
+import logging
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+from multidict import CIMultiDict
+from werkzeug.http import parse_etags
+
+logger = logging.getLogger(__name__)
+
+# Headers the WSGI response may set that aiohttp computes itself.
+HOP_HEADERS = {"content-length", "transfer-encoding", "connection"}
+
+
+class AsyncSubscriber:
+    # The event-loop side of FrameSubscriber: same drop-oldest queue, but
+    # awaited instead of blocking a thread per client.
+    def __init__(self, queue_size):
+        self.frames = collections.deque(maxlen=queue_size)
+        self.event = asyncio.Event()
+        self.delivered = 0
+        self.dropped = 0
+
+    def push(self, snapshot):
+        if len(self.frames) == self.frames.maxlen:
+            self.dropped += 1
+        self.frames.append(snapshot)
+        self.event.set()
+
+    async def get(self, timeout=None):
+        while not self.frames:
+            self.event.clear()
+            try:
+                await asyncio.wait_for(self.event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        self.delivered += 1
+        return self.frames.popleft()
+
+
+class AsyncFrameBridge:
+    # FrameStore listener that hands frames from the acquisition thread to
+    # the event loop. At most one wakeup is in flight: if the loop has not
+    # run it yet, a newer frame just replaces the pending one, so a busy
+    # loop costs the acquisition thread nothing but a lock and a pointer.
+    def __init__(self, queue_size=2):
+        self.queue_size = queue_size
+        self.loop = None
+        self.lock = threading.Lock()
+        self.pending = None
+        self.subscribers = set()
+        self.published = 0
+        self.coalesced = 0
+        self.closedDelivered = 0
+        self.closedDropped = 0
+
+    def attach(self, loop):
+        self.loop = loop
+
+    def publish(self, snapshot):
+        self.published += 1
+        if self.loop is None or not self.subscribers:
+            return
+        with self.lock:
+            scheduled = self.pending is not None
+            if scheduled:
+                self.coalesced += 1
+            self.pending = snapshot
+        if not scheduled:
+            self.loop.call_soon_threadsafe(self.deliver)
+
+    def deliver(self):
+        with self.lock:
+            snapshot, self.pending = self.pending, None
+        for subscriber in self.subscribers:
+            subscriber.push(snapshot)
+
+    # subscribe, unsubscribe and stats run on the event loop.
+    def subscribe(self):
+        subscriber = AsyncSubscriber(self.queue_size)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        if subscriber in self.subscribers:
+            self.subscribers.discard(subscriber)
+            self.closedDelivered += subscriber.delivered
+            self.closedDropped += subscriber.dropped
+
+    def stats(self):
+        subscribers = tuple(self.subscribers)
+        return {
+            "subscribers": len(subscribers),
+            "published": self.published,
+            "delivered": self.closedDelivered + sum(s.delivered for s in subscribers),
+            "dropped": self.closedDropped + sum(s.dropped for s in subscribers),
+            "coalesced": self.coalesced,
+        }
+
+
+class AsyncAPIServer(threading.Thread):
+    # Serves /thermal_data, the per-sensor /sensors/<id>/thermal_data and
+    # the frame stream from an asyncio loop. Every
+    # other path is passed to wsgi_app (the Flask app) on a small thread
+    # pool, so slow routes such as /archive never block the loop.
+    def __init__(self, frame_store, bridge, wsgi_app=None, host="0.0.0.0", port=5000,
+                 keepalive=15, workers=4, sensor_stores=None):
+        super(AsyncAPIServer, self).__init__(daemon=True)
+        self.frame_store = frame_store
+        self.bridge = bridge
+        self.wsgi_app = wsgi_app
+        self.sensor_stores = sensor_stores or {}
+        self.host = host
+        self.port = port
+        self.keepalive = keepalive
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="wsgi")
+        self.loop = None
+        self.ready = threading.Event()
+
+    def createApp(self):
+        app = web.Application()
+        app.router.add_get("/thermal_data", self.thermal_data)
+        app.router.add_get("/sensors/{sensor_id}/thermal_data", self.sensor_thermal_data)
+        app.router.add_get("/thermal_stream", self.thermal_stream)
+        app.router.add_get("/thermal_stream/stats", self.thermal_stream_stats)
+        if self.wsgi_app is not None:
+            app.router.add_route("*", "/{path:.*}", self.wsgi)
+        return app
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.bridge.attach(self.loop)
+        runner = web.AppRunner(self.createApp(), access_log=None)
+        self.loop.run_until_complete(runner.setup())
+        self.loop.run_until_complete(web.TCPSite(runner, self.host, self.port).start())
+        logger.info(f"API server listening on {self.host}:{self.port}.")
+        self.ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(runner.cleanup())
+            self.executor.shutdown(wait=False)
+            self.loop.close()
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join()
+
+    async def thermal_data(self, request):
+        return self.latestFrame(request, self.frame_store)
+
+    async def sensor_thermal_data(self, request):
+        sensor_id = request.match_info["sensor_id"]
+        store = self.sensor_stores.get(sensor_id)
+        if store is None:
+            return web.json_response({"error": f"unknown sensor '{sensor_id}'"}, status=404,
+                                     headers={"Access-Control-Allow-Origin": "*"})
+        return self.latestFrame(request, store)
+
+    def latestFrame(self, request, store):
+        snapshot = store.latest()
+        raw = request.query.get("raw") == "1" and snapshot.raw is not None
+        etag = store.etag(snapshot, raw)
+        headers = {
+            "ETag": f'"{etag}"',
+            "Cache-Control": "no-cache",
+            "Access-Control-Allow-Origin": "*",
+        }
+        if parse_etags(request.headers.get("If-None-Match")).contains(etag):
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=snapshot.to_json(raw), content_type="application/json", headers=headers)
+
+    async def thermal_stream(self, request):
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "Access-Control-Allow-Origin": "*",
+        })
+        await response.prepare(request)
+        subscriber = self.bridge.subscribe()
+        try:
+            while True:
+                snapshot = await subscriber.get(self.keepalive)
+                if snapshot is None:
+                    await response.write(b": keep-alive\n\n")
+                else:
+                    await response.write(b"id: %d\ndata: %s\n\n" % (snapshot.seq, snapshot.to_json()))
+        except ConnectionResetError:
+            pass
+        finally:
+            self.bridge.unsubscribe(subscriber)
+        return response
+
+    async def thermal_stream_stats(self, request):
+        return web.json_response(self.bridge.stats(), headers={"Access-Control-Allow-Origin": "*"})
+
+    async def wsgi(self, request):
+        body = await request.read()
+        environ = {
+            "REQUEST_METHOD": request.method,
+            "SCRIPT_NAME": "",
+            "PATH_INFO": request.path,
+            "QUERY_STRING": request.query_string,
+            "SERVER_NAME": self.host,
+            "SERVER_PORT": str(self.port),
+            "SERVER_PROTOCOL": "HTTP/%d.%d" % request.version,
+            "REMOTE_ADDR": request.remote or "",
+            "CONTENT_TYPE": request.headers.get("Content-Type", ""),
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": request.scheme,
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in request.headers.items():
+            key = "HTTP_" + name.upper().replace("-", "_")
+            if key in ("HTTP_CONTENT_TYPE", "HTTP_CONTENT_LENGTH"):
+                continue
+            environ[key] = environ[key] + "," + value if key in environ else value
+
+        status, headers, payload, stream = await self.loop.run_in_executor(self.executor, self.callWsgi, environ)
+        status = int(status.split(" ", 1)[0])
+        headers = CIMultiDict((name, value) for name, value in headers if name.lower() not in HOP_HEADERS)
+        if stream is None:
+            return web.Response(status=status, body=payload, headers=headers)
+        chunks, result = stream
+
+        # A streamed Flask response (no Content-Length): pull the remaining
+        # chunks on the pool and send them as they come.
+        response = web.StreamResponse(status=status, headers=headers)
+        try:
+            await response.prepare(request)
+            await response.write(payload)
+            while True:
+                chunk = await self.loop.run_in_executor(self.executor, next, chunks, None)
+                if chunk is None:
+                    break
+                await response.write(chunk)
+            await response.write_eof()
+        except ConnectionResetError:
+            pass
+        finally:
+            if hasattr(result, "close"):
+                await self.loop.run_in_executor(self.executor, result.close)
+        return response
+
+    def callWsgi(self, environ):
+        # Returns the whole body, or the first chunk and the still-open
+        # result when the response is streamed.
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [status, headers]
+
+        result = self.wsgi_app(environ, start_response)
+        chunks = iter(result)
+        try:
+            first = next(chunks, b"")
+            status, headers = started
+            if not any(name.lower() == "content-length" for name, _ in headers):
+                return status, headers, first, (chunks, result)
+            payload = first + b"".join(chunks)
+        except BaseException:
+            if hasattr(result, "close"):
+                result.close()
+            raise
+        if hasattr(result, "close"):
+            result.close()
+        return status, headers, payload, None
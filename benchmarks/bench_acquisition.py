@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from frame_decode import PIXEL_COUNT, decode_frame
+from frame_sources import SyntheticSource
+from shared_frames import SharedFrameRing, start_acquisition, wait_for_frames
+
+# Frame timing jitter of in-process acquisition (a DataReader-style thread)
+# against the acquisition process, with and without load in the main
+# interpreter. The load threads run big json.dumps calls, which hold the
+# GIL for their whole duration, as a large API response or a Supabase
+# upsert does. Jitter is measured on the acquisition timestamps; delivery
+# is how long a frame then takes to reach the main process.
+
+MODES = ("thread", "process")
+
+
+def load(stopping, size):
+    rows = [{"id": i, "logged_at": "2026-10-17T00:00:00", "avg_temperature": 31.5 + i % 7} for i in range(size)]
+    while not stopping.is_set():
+        json.dumps(rows)
+
+
+def acquire_thread(fps, duration, stamps):
+    source = SyntheticSource(fps=fps, seed=0)
+    end = time.time() + duration
+    while time.time() < end:
+        decoded = decode_frame(source.read())
+        if decoded is not None:
+            now = time.time()
+            stamps.append((now, now))
+
+
+def child_rss(pid):
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def acquire_process(fps, duration, stamps):
+    ring = SharedFrameRing(capacity=64)
+    process, (wakeup,) = start_acquisition([("0", f"synthetic:{fps:g}", ring)], "auto")
+    # Wait for the first frame, so process start-up is not measured.
+    wait_for_frames(wakeup, None)
+    lastSeq = ring.written
+    frame = np.empty(PIXEL_COUNT, dtype=np.float32)
+    end = time.time() + duration
+    while time.time() < end:
+        if not wait_for_frames(wakeup, 1):
+            continue
+        written = ring.written
+        for seq in range(max(lastSeq + 1, written - ring.capacity + 1), written + 1):
+            result = ring.read(seq, frame)
+            if result is not None:
+                stamps.append((result[0], time.time()))
+        lastSeq = written
+    rss = child_rss(process.pid)
+    process.terminate()
+    process.wait()
+    os.close(wakeup)
+    ring.close()
+    return rss
+
+
+def measure(mode, fps, duration, load_threads, load_size):
+    stopping = threading.Event()
+    loaders = [threading.Thread(target=load, args=(stopping, load_size), daemon=True) for _ in range(load_threads)]
+    for loader in loaders:
+        loader.start()
+    stamps = []
+    rss = float("nan")
+    try:
+        if mode == "thread":
+            acquire_thread(fps, duration, stamps)
+        else:
+            rss = acquire_process(fps, duration, stamps)
+    finally:
+        stopping.set()
+        for loader in loaders:
+            loader.join()
+
+    acquired = np.array([stamp for stamp, _ in stamps])
+    delivered = np.array([done - stamp for stamp, done in stamps]) * 1000
+    interval = 1 / fps
+    jitter = np.abs(np.diff(acquired) - interval) * 1000
+    return {
+        "mode": mode,
+        "load_threads": load_threads,
+        "frames": len(acquired),
+        "expected": int(duration * fps),
+        "jitter_p50_ms": float(np.percentile(jitter, 50)),
+        "jitter_p99_ms": float(np.percentile(jitter, 99)),
+        "jitter_max_ms": float(jitter.max()),
+        "late_frames": int(np.count_nonzero(np.diff(acquired) > 1.5 * interval)),
+        "delivery_p99_ms": float(np.percentile(delivered, 99)),
+        "child_rss_mb": rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Acquisition jitter with and without API-style load.")
+    parser.add_argument("--mode", choices=MODES + ("both",), default="both")
+    parser.add_argument("--fps", type=float, default=16)
+    parser.add_argument("--duration", type=float, default=10, help="seconds per run")
+    parser.add_argument("--load-threads", default="0,4", help="comma-separated load thread counts")
+    parser.add_argument("--load-size", type=int, default=100000, help="rows serialized per json.dumps call")
+    args = parser.parse_args()
+
+    modes = MODES if args.mode == "both" else (args.mode,)
+    print("%-8s %5s %8s %10s %10s %10s %6s %13s %10s" % (
+        "mode", "load", "frames", "jitter p50", "jitter p99", "jitter max", "late", "delivery p99", "child RSS"))
+    for loadThreads in (int(count) for count in args.load_threads.split(",")):
+        for mode in modes:
+            row = measure(mode, args.fps, args.duration, loadThreads, args.load_size)
+            print("%-8s %5d %4d/%-4d %8.2fms %8.2fms %8.2fms %6d %11.2fms %8.1fMB" % (
+                row["mode"], row["load_threads"], row["frames"], row["expected"], row["jitter_p50_ms"],
+                row["jitter_p99_ms"], row["jitter_max_ms"], row["late_frames"], row["delivery_p99_ms"],
+                row["child_rss_mb"]))
+
+
+if __name__ == "__main__":
+    main()
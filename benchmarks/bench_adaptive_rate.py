@@ -0,0 +1,98 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from adaptive_rate import AdaptiveRateController
+from fever_detection import FEVER, FeverDetector
+from frame_decode import decode_frame
+from frame_sources import SyntheticSource
+from frame_store import FrameStore
+
+# Simulated comparison of fixed refresh rates against the adaptive
+# controller. The synthetic pen advances at TICK_RATE ticks per second of
+# simulated time; a sensor at R Hz sees every TICK_RATE / R-th tick. Frames
+# read stand in for I2C traffic and CPU, and fever latency is the time from
+# a fever starting to the detector's alarm.
+
+TICK_RATE = 32
+THRESHOLD = 40.6
+
+
+def simulate(rate, seconds, speed, seed):
+    source = SyntheticSource(fps=0, seed=seed, fever_rate=0.2, fever_duration=15)
+    source.fps = TICK_RATE
+    source.fever_frames = 15 * TICK_RATE
+    source.velocity *= speed
+    store = FrameStore()
+    alarms = []
+    detector = FeverDetector(THRESHOLD, cooldown=0, on_event=lambda event: alarms.append(event.snapshot.timestamp)
+                             if event.kind == FEVER else None)
+    store.add_listener(detector.process)
+    controller = None
+    if rate == "adaptive":
+        controller = AdaptiveRateController(THRESHOLD)
+        store.add_listener(lambda snapshot: controller.process(snapshot, snapshot.timestamp))
+
+    frames = 0
+    feverStarts = []
+    wasFever = False
+    tick = 0
+    nextRead = 0
+    timeAt = {}
+    while tick < seconds * TICK_RATE:
+        frame = source.read()
+        now = tick / TICK_RATE
+        if source.feverActive and not wasFever:
+            feverStarts.append(now)
+        wasFever = source.feverActive
+        if tick >= nextRead:
+            current = controller.rate if controller is not None else rate
+            timeAt[current] = timeAt.get(current, 0) + 1 / current
+            decoded = decode_frame(frame)
+            if decoded is not None:
+                store.publish(*decoded, now)
+                frames += 1
+            nextRead = tick + TICK_RATE / (controller.rate if controller is not None else rate)
+        tick += 1
+
+    latencies = []
+    for start in feverStarts:
+        later = [alarm - start for alarm in alarms if alarm >= start]
+        if later:
+            latencies.append(later[0])
+    return {
+        "rate": rate,
+        "frames": frames,
+        "frames_per_s": frames / seconds,
+        "fevers": len(feverStarts),
+        "detected": len(latencies),
+        "latency_p50_s": float(np.median(latencies)) if latencies else float("nan"),
+        "latency_max_s": max(latencies) if latencies else float("nan"),
+        "time_at": {hz: round(spent / seconds * 100, 1) for hz, spent in sorted(timeAt.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adaptive refresh rate simulation.")
+    parser.add_argument("--seconds", type=float, default=1800, help="simulated time")
+    parser.add_argument("--speed", default="0,0.2,1", help="comma-separated chick speeds (1 = synthetic default)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print("%-6s %-9s %8s %7s %9s %11s %11s  %s" % (
+        "speed", "rate", "frames/s", "fevers", "detected", "latency p50", "latency max", "% time at Hz"))
+    for speed in (float(value) for value in args.speed.split(",")):
+        for rate in (2, 8, 32, "adaptive"):
+            row = simulate(rate, args.seconds, speed, args.seed)
+            print("%-6g %-9s %8.2f %7d %9d %10.2fs %10.2fs  %s" % (
+                speed, row["rate"], row["frames_per_s"], row["fevers"], row["detected"],
+                row["latency_p50_s"], row["latency_max_s"], row["time_at"]))
+
+
+if __name__ == "__main__":
+    main()
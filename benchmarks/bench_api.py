@@ -0,0 +1,185 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from frame_decode import decode_frame
+from frame_store import FrameStore
+from frame_sources import SyntheticSource
+
+# Load test for the HTTP API: N concurrent clients poll one route as fast as
+# they can against the asyncio server and the Flask development server.
+# Each server runs in its own process next to a simulated acquisition
+# thread, whose frame lateness shows how much the server steals from it.
+
+SERVERS = ("asyncio", "flask")
+
+
+def create_flask_app(store):
+    # Same handler as main.thermal_data.
+    from flask import Flask, request
+    app = Flask(__name__)
+
+    @app.route('/thermal_data')
+    def thermal_data():
+        snapshot = store.latest()
+        etag = store.etag(snapshot)
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(snapshot.to_json(), mimetype="application/json")
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    return app
+
+
+def acquire(store, fps, lateness, stopping):
+    source = SyntheticSource(fps=0, seed=0)
+    interval = 1 / fps
+    deadline = time.perf_counter()
+    while not stopping.is_set():
+        deadline += interval
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        lateness.append(time.perf_counter() - deadline)
+        decoded = decode_frame(source.read())
+        if decoded is not None:
+            store.publish(*decoded)
+
+
+def serve(server, port, fps, control):
+    store = FrameStore()
+    lateness = []
+    stopping = threading.Event()
+    threading.Thread(target=acquire, args=(store, fps, lateness, stopping), daemon=True).start()
+
+    if server == "asyncio":
+        from api_server import AsyncAPIServer, AsyncFrameBridge
+        bridge = AsyncFrameBridge()
+        store.add_listener(bridge.publish)
+        api = AsyncAPIServer(store, bridge, host="127.0.0.1", port=port)
+        api.start()
+        api.ready.wait()
+    else:
+        from werkzeug.serving import make_server
+        import logging
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        # What flask_app.run() starts: Werkzeug's threaded server.
+        httpd = make_server("127.0.0.1", port, create_flask_app(store), threaded=True)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    control.send("ready")
+    while True:
+        command = control.recv()
+        if command == "reset":
+            lateness.clear()
+            control.send("ok")
+        elif command == "report":
+            samples = np.array(lateness) * 1000
+            control.send({
+                "frames": len(samples),
+                "late_p50_ms": float(np.percentile(samples, 50)) if len(samples) else 0.0,
+                "late_p99_ms": float(np.percentile(samples, 99)) if len(samples) else 0.0,
+            })
+        else:
+            stopping.set()
+            control.send("bye")
+            return
+
+
+async def client(session, url, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            async with session.get(url) as response:
+                await response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+                    continue
+        except Exception as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def load(url, clients, duration):
+    import aiohttp
+    latencies = []
+    errors = []
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(client(session, url, deadline, latencies, errors) for _ in range(clients)))
+    return latencies, errors
+
+
+def run_server(server, port, clients, duration, path, fps):
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=serve, args=(server, port, fps, child), daemon=True)
+    process.start()
+    parent.recv()
+
+    rows = []
+    url = f"http://127.0.0.1:{port}{path}"
+    for count in clients:
+        parent.send("reset")
+        parent.recv()
+        latencies, errors = asyncio.run(load(url, count, duration))
+        parent.send("report")
+        acquisition = parent.recv()
+        samples = np.array(latencies) * 1000
+        rows.append({
+            "server": server,
+            "clients": count,
+            "requests_per_s": len(samples) / duration,
+            "p50_ms": float(np.percentile(samples, 50)) if len(samples) else 0.0,
+            "p99_ms": float(np.percentile(samples, 99)) if len(samples) else 0.0,
+            "errors": len(errors),
+            **acquisition,
+        })
+        report_row(rows[-1])
+
+    parent.send("stop")
+    parent.recv()
+    process.join(5)
+    return rows
+
+
+def report_row(row):
+    print("%-8s %7d %10.0f %9.2f %9.2f %7d %12.2f %12.2f" % (
+        row["server"], row["clients"], row["requests_per_s"], row["p50_ms"], row["p99_ms"],
+        row["errors"], row["late_p50_ms"], row["late_p99_ms"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP API load test.")
+    parser.add_argument("--server", choices=SERVERS + ("both",), default="both")
+    parser.add_argument("--clients", default="1,8,32,128", help="comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=5, help="seconds per client count")
+    parser.add_argument("--path", default="/thermal_data")
+    parser.add_argument("--port", type=int, default=5078)
+    parser.add_argument("--fps", type=float, default=8, help="simulated acquisition rate")
+    args = parser.parse_args()
+
+    clients = [int(count) for count in args.clients.split(",")]
+    servers = SERVERS if args.server == "both" else (args.server,)
+    print("%-8s %7s %10s %9s %9s %7s %12s %12s" % (
+        "server", "clients", "req/s", "p50 ms", "p99 ms", "errors", "acq late p50", "acq late p99"))
+    for offset, server in enumerate(servers):
+        run_server(server, args.port + offset, clients, args.duration, args.path, args.fps)
+
+
+if __name__ == "__main__":
+    main()
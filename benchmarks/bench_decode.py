@@ -0,0 +1,126 @@
+import os
+import random
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_decode import decode_frame
+
+
+def isDigital(value):
+    try:
+        if value == "nan":
+            return False
+        else:
+            float(value)
+        return True
+    except ValueError:
+        return False
+
+
+# The per-pixel loop DataReader.run used before frame_decode, kept verbatim
+# as the reference implementation.
+def legacy_decode(hetData):
+    maxHet = 0
+    minHet = 500
+    tempData = []
+
+    if len(hetData) < 192:
+        return None
+
+    for i in range(0, 192):
+        curCol = i % 32
+        curData = None
+
+        if i < len(hetData) and isDigital(hetData[i]):
+            curData = float(hetData[i])
+        else:
+            interpolationPointCount = 0
+            sumValue = 0
+
+            abovePointIndex = i - 32
+            if abovePointIndex > 0 and hetData[abovePointIndex] != "nan":
+                interpolationPointCount += 1
+                sumValue += float(hetData[abovePointIndex])
+
+            belowPointIndex = i + 32
+            if belowPointIndex < 192 and hetData[belowPointIndex] != "nan":
+                interpolationPointCount += 1
+                sumValue += float(hetData[belowPointIndex])
+
+            leftPointIndex = i - 1
+            if curCol != 31 and hetData[leftPointIndex] != "nan":
+                interpolationPointCount += 1
+                sumValue += float(hetData[leftPointIndex])
+
+            rightPointIndex = i + 1
+            if belowPointIndex < 192 and curCol != 0 and hetData[rightPointIndex] != "nan":
+                interpolationPointCount += 1
+                sumValue += float(hetData[rightPointIndex])
+
+            curData = sumValue / interpolationPointCount if interpolationPointCount else 0
+
+        tempData.append(curData)
+        maxHet = max(curData, maxHet)
+        minHet = min(curData, minHet)
+
+    if maxHet == 0 or minHet == 500:
+        return None
+    return tempData, minHet, maxHet
+
+
+def make_frames(count, nan_ratio, seed=0):
+    rng = random.Random(seed)
+    frames = []
+    for _ in range(count):
+        frame = []
+        for _ in range(192):
+            if rng.random() < nan_ratio:
+                frame.append("nan")
+            else:
+                frame.append("%.2f" % rng.uniform(25.0, 42.0))
+        frames.append(frame)
+    return frames
+
+
+def check_equivalence(frames):
+    for hetData in frames:
+        expected = legacy_decode(hetData)
+        actual = decode_frame(hetData)
+        if expected is None or actual is None:
+            assert expected is None and actual is None
+            continue
+        np.testing.assert_allclose(actual[0], expected[0], rtol=1e-6, atol=1e-4)
+        assert abs(actual[1] - expected[1]) < 1e-4
+        assert abs(actual[2] - expected[2]) < 1e-4
+
+
+def bench(name, func, frames, repeat):
+    def step():
+        for hetData in frames:
+            func(hetData)
+
+    best = min(timeit.repeat(step, number=1, repeat=repeat))
+    perFrame = best / len(frames) * 1e6
+    print("%-8s %8.1f us/frame  %8.0f frames/s" % (name, perFrame, 1e6 / perFrame))
+    return perFrame
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) >= 2 else 500
+    repeat = int(sys.argv[2]) if len(sys.argv) >= 3 else 5
+
+    for nan_ratio in (0.0, 0.02, 0.2):
+        frames = make_frames(count, nan_ratio)
+        check_equivalence(frames)
+        print("nan ratio %.2f (%d frames)" % (nan_ratio, count))
+        legacy = bench("legacy", legacy_decode, frames, repeat)
+        numpy_ = bench("numpy", decode_frame, frames, repeat)
+        print("speedup  %8.1fx" % (legacy / numpy_))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import storage
+from frame_archive import FrameArchive
+from frame_decode import decode_frame
+from frame_store import FrameStore
+from frame_stream import FrameBroadcaster
+from frame_codec import encode_keyframe
+from frame_sources import SyntheticSource, open_source
+from fever_detection import FeverDetector
+from rollups import RollupAggregator
+from sensors import Sensor, publish_frame
+from temporal_filter import FILTERS, create_filter
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+THRESHOLD = 40.6
+
+# Metrics compared against the baseline and which direction is worse.
+HIGHER_IS_BETTER = {"fps"}
+# Tail latencies are noisier than medians, and the sub-10 us stages would
+# flap on scheduler jitter alone, so both get extra headroom.
+TAIL_TOLERANCE_FACTOR = 2
+LATENCY_SLACK_US = 5
+
+
+def percentile(samples, q):
+    return float(np.percentile(samples, q)) if samples else 0.0
+
+
+class StageTimer:
+    # Collects the seconds passed to observe() as nanoseconds, standing in
+    # for main.py's stage histogram.
+    def __init__(self, samples):
+        self.samples = samples
+
+    def observe(self, seconds):
+        self.samples.append(seconds * 1e9)
+
+
+# Publish, filter and log rows go through the same functions main.py uses
+# (sensors.publish_frame, storage.log_row), so a regression there shows up
+# against the baseline.
+def run_pipeline(source, frames, workdir, subscribers, log_every, filter_kind=None):
+    engine = storage.create_storage_engine("sqlite:///" + os.path.join(workdir, "bench.db"))
+    storage.init_db(engine)
+    buffer = storage.WriteBehindBuffer(engine, max_rows=50)
+
+    store = FrameStore()
+    broadcaster = FrameBroadcaster(2)
+    store.add_listener(broadcaster.publish)
+    clients = [broadcaster.subscribe() for _ in range(subscribers)]
+    archive = FrameArchive(os.path.join(workdir, "bench.ring"), max(frames, 1))
+    store.add_listener(archive.append)
+    rollups = RollupAggregator(buffer.add, THRESHOLD)
+    store.add_listener(rollups.add)
+    detector = FeverDetector(THRESHOLD)
+    sensor = Sensor(storage.DEFAULT_SENSOR_ID, "bench", source, store)
+    sensor.filter = create_filter(filter_kind) if filter_kind else None
+
+    stages = {name: [] for name in ("read", "decode", "filter", "publish", "detect", "log", "flush", "json", "binary")}
+    filterTime = StageTimer(stages["filter"])
+    clock = time.perf_counter_ns
+    published = 0
+    fevers = 0
+
+    cpuStart = time.process_time()
+    wallStart = time.perf_counter()
+    for _ in range(frames):
+        t0 = clock()
+        raw = source.read()
+        t1 = clock()
+        decoded = decode_frame(raw)
+        t2 = clock()
+        stages["read"].append(t1 - t0)
+        stages["decode"].append(t2 - t1)
+        if decoded is None:
+            continue
+
+        snapshot = publish_frame(sensor, *decoded, time.time(), filterTime)
+        t3 = clock()
+        detector.process(snapshot)
+        fever = detector.active
+        t4 = clock()
+        stages["publish"].append(t3 - t2 - (stages["filter"][-1] if sensor.filter is not None else 0))
+        stages["detect"].append(t4 - t3)
+        published += 1
+        fevers += fever
+
+        if fever or published % log_every == 0:
+            t5 = clock()
+            buffer.add(*storage.log_row("monitor_log", snapshot))
+            stages["log"].append(clock() - t5)
+        if buffer.count >= buffer.max_rows:
+            t6 = clock()
+            buffer.flush()
+            stages["flush"].append(clock() - t6)
+
+        t7 = clock()
+        snapshot.to_json()
+        t8 = clock()
+        encode_keyframe(snapshot)
+        t9 = clock()
+        stages["json"].append(t8 - t7)
+        stages["binary"].append(t9 - t8)
+
+        for client in clients:
+            client.get(timeout=0)
+
+    rollups.flush()
+    buffer.flush()
+    wall = time.perf_counter() - wallStart
+    cpu = time.process_time() - cpuStart
+
+    results = {
+        "frames": published,
+        "fever_frames": fevers,
+        "fever_alarms": detector.stats["alarms"],
+        "fps": published / wall if wall else 0.0,
+        "cpu_ms_per_frame": cpu / published * 1000 if published else 0.0,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stages": {},
+    }
+    for name, samples in stages.items():
+        results["stages"][name] = {
+            "count": len(samples),
+            "p50_us": percentile(samples, 50) / 1000,
+            "p99_us": percentile(samples, 99) / 1000,
+        }
+    return results
+
+
+def flatten(results):
+    metrics = {"fps": results["fps"], "cpu_ms_per_frame": results["cpu_ms_per_frame"]}
+    for name, stage in results["stages"].items():
+        if stage["count"]:
+            metrics[f"{name}.p50_us"] = stage["p50_us"]
+            metrics[f"{name}.p99_us"] = stage["p99_us"]
+    return metrics
+
+
+def compare(results, baseline, tolerance):
+    failures = []
+    current = flatten(results)
+    for name, expected in flatten(baseline).items():
+        actual = current.get(name)
+        if actual is None or not expected:
+            continue
+        if name in HIGHER_IS_BETTER:
+            regressed = actual < expected * (1 - tolerance)
+        elif name.endswith("_us"):
+            allowed = tolerance * TAIL_TOLERANCE_FACTOR if name.endswith("p99_us") else tolerance
+            regressed = actual > expected * (1 + allowed) + LATENCY_SLACK_US
+        else:
+            regressed = actual > expected * (1 + tolerance)
+        if regressed:
+            failures.append(f"{name}: {actual:.2f} vs baseline {expected:.2f}")
+    return failures
+
+
+def report(results):
+    print("frames %d (%d with fever pixels, %d alarms)"
+          % (results["frames"], results["fever_frames"], results.get("fever_alarms", 0)))
+    print("%.0f frames/s, %.3f ms CPU/frame, peak RSS %.1f MB"
+          % (results["fps"], results["cpu_ms_per_frame"], results["peak_rss_mb"]))
+    print("%-8s %8s %10s %10s" % ("stage", "count", "p50 us", "p99 us"))
+    for name, stage in results["stages"].items():
+        print("%-8s %8d %10.1f %10.1f" % (name, stage["count"], stage["p50_us"], stage["p99_us"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end thermal pipeline benchmark.")
+    parser.add_argument("--frames", type=int, default=5000)
+    parser.add_argument("--source", default="synthetic",
+                        help="synthetic, or replay:<file> for a recorded capture")
+    parser.add_argument("--subscribers", type=int, default=4, help="simulated stream clients")
+    parser.add_argument("--log-every", type=int, default=8, help="log one row every N frames")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--filter", choices=FILTERS, help="temporal filter between decode and publish")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative regression before failing")
+    args = parser.parse_args()
+
+    if args.source == "synthetic":
+        source = SyntheticSource(fps=0, seed=0, fever_rate=6)
+    else:
+        source = open_source(args.source + ("" if "@" in args.source else "@0"))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run_pipeline(source, args.frames, workdir, args.subscribers, args.log_every, args.filter)
+    results["machine"] = platform.machine()
+    results["python"] = platform.python_version()
+    results["source"] = args.source
+    results["filter"] = args.filter
+    report(results)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as output:
+            json.dump(results, output, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.")
+        return
+
+    with open(args.baseline) as stored:
+        baseline = json.load(stored)
+    if baseline.get("machine") != results["machine"]:
+        print(f"Warning: baseline was recorded on {baseline.get('machine')}, "
+              f"this is {results['machine']}.")
+    failures = compare(results, baseline, args.tolerance)
+    if failures:
+        print("PERFORMANCE REGRESSION (tolerance %d%%):" % (args.tolerance * 100))
+        for failure in failures:
+            print("  " + failure)
+        sys.exit(1)
+    print("No regressions against baseline (tolerance %d%%)." % (args.tolerance * 100))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import collections
+
+FeverEvent = collections.namedtuple("FeverEvent", ["kind", "snapshot"])
+
+FEVER = "fever"
+CLEAR = "clear"
+
+
+class FeverDetector:
+    # Runs on every published frame. A fever is raised after `persistence`
+    # consecutive frames with a pixel above the threshold and cleared after
+    # `clear_frames` consecutive frames at least `hysteresis` degrees below
+    # it. While a fever lasts the alarm repeats every `cooldown` seconds,
+    # and no two alarms are ever closer than that, even across a clear.
+    def __init__(self, threshold, persistence=3, clear_frames=8, hysteresis=0.5, cooldown=30.0,
+                 on_event=None):
+        self.threshold = threshold
+        self.persistence = persistence
+        self.clear_frames = clear_frames
+        self.hysteresis = hysteresis
+        self.cooldown = cooldown
+        self.on_event = on_event
+        self.active = False
+        self.hotFrames = 0
+        self.coolFrames = 0
+        self.lastAlarm = None
+        self.settings = None
+        self.applied = None
+        self.stats = {"alarms": 0, "clears": 0, "suppressed": 0}
+
+    def configure(self, threshold, persistence, clear_frames, hysteresis, cooldown):
+        # Called from any thread; the new settings take effect together at
+        # the start of the next frame, and the current fever state is kept.
+        self.settings = (threshold, persistence, clear_frames, hysteresis, cooldown)
+
+    def process(self, snapshot):
+        if not snapshot:
+            return
+        settings = self.settings
+        if settings is not self.applied:
+            self.applied = settings
+            self.threshold, self.persistence, self.clear_frames, self.hysteresis, self.cooldown = settings
+        # maxHet is the frame's hottest pixel, so this is the same test as
+        # scanning every pixel against the threshold.
+        hot = snapshot.maxHet > self.threshold
+        if not self.active:
+            self.hotFrames = self.hotFrames + 1 if hot else 0
+            if self.hotFrames >= self.persistence:
+                self.active = True
+                self.coolFrames = 0
+                self.alarm(snapshot)
+            return
+
+        cool = snapshot.maxHet <= self.threshold - self.hysteresis
+        self.coolFrames = self.coolFrames + 1 if cool else 0
+        if self.coolFrames >= self.clear_frames:
+            self.active = False
+            self.hotFrames = 0
+            self.stats["clears"] += 1
+            self.emit(CLEAR, snapshot)
+        elif hot and snapshot.timestamp - self.lastAlarm >= self.cooldown:
+            self.alarm(snapshot)
+
+    def alarm(self, snapshot):
+        if self.lastAlarm is not None and snapshot.timestamp - self.lastAlarm < self.cooldown:
+            self.stats["suppressed"] += 1
+            return
+        self.lastAlarm = snapshot.timestamp
+        self.stats["alarms"] += 1
+        self.emit(FEVER, snapshot)
+
+    def emit(self, kind, snapshot):
+        if self.on_event is not None:
+            self.on_event(FeverEvent(kind, snapshot))
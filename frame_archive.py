@@ -0,0 +1,236 @@
+import errno
+import logging
+import os
+
+import numpy as np
+
+from frame_codec import centi_frame
+from frame_decode import PIXEL_COUNT
+
+logger = logging.getLogger(__name__)
+
+# Fixed-size ring of raw frames in a memory-mapped file:
+#   64-byte header | capacity x record
+# The header's "written" counter is the total number of records ever
+# appended; record n lives in slot n % capacity. It is bumped only after
+# the record is complete, so readers never see a half-written slot as
+# valid. The file is reused across restarts when its layout matches.
+# Timestamps are wall-clock and can go backwards (NTP step, RTC reset);
+# "unsorted_until" is the written count from which the ring is in
+# timestamp order again, i.e. once the last backward step is overwritten.
+# Archives written before that was tracked lack FLAG_ORDER_TRACKED and
+# are scanned once when opened.
+MAGIC = b"TFAR"
+VERSION = 1
+HEADER_SIZE = 64
+HEADER = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u4"),
+    ("capacity", "<u8"),
+    ("written", "<u8"),
+    ("pixel_format", "S8"),
+    ("unsorted_until", "<u8"),
+    ("flags", "<u4"),
+])
+FLAG_ORDER_TRACKED = 0x01
+
+PIXEL_DTYPES = {"int16": "<i2", "float32": "<f4"}
+
+
+def record_dtype(pixel_format):
+    return np.dtype([
+        ("seq", "<u8"),
+        ("timestamp", "<f8"),
+        ("minHet", "<f4"),
+        ("maxHet", "<f4"),
+        ("pixels", PIXEL_DTYPES[pixel_format], (PIXEL_COUNT,)),
+    ])
+
+
+class FrameArchive:
+    def __init__(self, path, capacity, pixel_format="int16"):
+        if pixel_format not in PIXEL_DTYPES:
+            raise ValueError(f"pixel_format must be one of {', '.join(PIXEL_DTYPES)}")
+        self.path = path
+        self.capacity = capacity
+        self.pixel_format = pixel_format
+        self.dtype = record_dtype(pixel_format)
+        size = HEADER_SIZE + capacity * self.dtype.itemsize
+
+        if not self.matches(path, size):
+            if os.path.exists(path):
+                logger.warning(f"Frame archive {path} has a different layout, starting a new one.")
+            self.create(path, size)
+
+        self.header = np.memmap(path, dtype=HEADER, mode="r+", shape=(1,))
+        self.records = np.memmap(path, dtype=self.dtype, mode="r+", offset=HEADER_SIZE, shape=(capacity,))
+        header = self.header[0]
+        if header["magic"] != MAGIC:
+            header["magic"] = MAGIC
+            header["version"] = VERSION
+            header["capacity"] = capacity
+            header["written"] = 0
+            header["pixel_format"] = pixel_format.encode()
+            header["flags"] = FLAG_ORDER_TRACKED
+            self.header.flush()
+        elif not header["flags"] & FLAG_ORDER_TRACKED:
+            if self.written and not self.sorted(self.ordered()):
+                header["unsorted_until"] = self.written + capacity
+            header["flags"] |= FLAG_ORDER_TRACKED
+            self.header.flush()
+
+    @staticmethod
+    def create(path, size):
+        # The blocks are allocated now rather than left as holes: a write
+        # through the memmap into a hole on a full card raises SIGBUS and
+        # takes the whole process down. A full card fails here instead.
+        try:
+            with open(path, "wb") as archive:
+                try:
+                    os.posix_fallocate(archive.fileno(), 0, size)
+                except (AttributeError, OSError) as e:
+                    if isinstance(e, OSError) and e.errno not in (errno.EOPNOTSUPP, errno.EINVAL, errno.ENOSYS):
+                        raise
+                    chunk = bytes(1 << 20)
+                    for offset in range(0, size, len(chunk)):
+                        archive.write(chunk[:size - offset])
+        except OSError:
+            os.remove(path)
+            raise
+
+    @classmethod
+    def open(cls, path):
+        header = np.fromfile(path, dtype=HEADER, count=1)[0]
+        if header["magic"] != MAGIC or header["version"] != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} frame archive")
+        return cls(path, int(header["capacity"]), header["pixel_format"].decode())
+
+    def matches(self, path, size):
+        if not os.path.exists(path) or os.path.getsize(path) != size:
+            return False
+        header = np.fromfile(path, dtype=HEADER, count=1)[0]
+        return (header["magic"] == MAGIC and header["version"] == VERSION
+                and header["capacity"] == self.capacity
+                and header["pixel_format"] == self.pixel_format.encode())
+
+    @property
+    def written(self):
+        return int(self.header[0]["written"])
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+    def append(self, snapshot):
+        if not snapshot.frame.size:
+            return
+        written = self.written
+        if written and snapshot.timestamp < self.records[(written - 1) % self.capacity]["timestamp"]:
+            self.header[0]["unsorted_until"] = written + self.capacity
+        record = self.records[written % self.capacity]
+        record["seq"] = snapshot.seq
+        record["timestamp"] = snapshot.timestamp
+        if snapshot.raw is not None:
+            # The sensor's own frame, not the temporal filter's output:
+            # smoothing would hide the single-frame spikes an alert is
+            # investigated for.
+            record["minHet"] = float(snapshot.raw.min())
+            record["maxHet"] = float(snapshot.raw.max())
+            if self.pixel_format == "int16":
+                record["pixels"] = np.clip(np.round(snapshot.raw * 100), -32768, 32767)
+            else:
+                record["pixels"] = snapshot.raw
+        else:
+            record["minHet"] = snapshot.minHet
+            record["maxHet"] = snapshot.maxHet
+            if self.pixel_format == "int16":
+                record["pixels"] = centi_frame(snapshot)
+            else:
+                record["pixels"] = snapshot.frame
+        self.header[0]["written"] = written + 1
+
+    def last(self):
+        written = self.written
+        if not written:
+            return None
+        return self.records[(written - 1) % self.capacity].copy()
+
+    def segments(self, start=None, end=None):
+        # Zero-copy views over the records with start <= timestamp < end,
+        # oldest first: one segment, or two when the range spans the wrap.
+        # They are live views into the ring, so the oldest records can be
+        # overwritten while a caller holds them; use read() for a stable copy.
+        return [view for _, view in self.select(start, end)]
+
+    def ordered(self, written=None):
+        # (logical index of the first record, view) for the records in the
+        # ring, oldest first.
+        written = self.written if written is None else written
+        head = written % self.capacity
+        if written < self.capacity:
+            return [(0, self.records[:head])]
+        first = written - self.capacity
+        return [(first, self.records[head:]), (first + self.capacity - head, self.records[:head])]
+
+    def sorted(self, ordered):
+        previous = None
+        for _, segment in ordered:
+            timestamps = segment["timestamp"]
+            if np.any(timestamps[1:] < timestamps[:-1]) or (len(timestamps) and previous is not None
+                                                             and timestamps[0] < previous):
+                return False
+            if len(timestamps):
+                previous = timestamps[-1]
+        return True
+
+    def select(self, start, end):
+        written = self.written
+        ordered = self.ordered(written)
+        selected = []
+        if written < self.header[0]["unsorted_until"]:
+            # Binary search needs sorted timestamps; scan instead, keeping
+            # each run of matching records as one view.
+            for logical, segment in ordered:
+                timestamps = segment["timestamp"]
+                mask = np.ones(len(segment), dtype=bool)
+                if start is not None:
+                    mask &= timestamps >= start
+                if end is not None:
+                    mask &= timestamps < end
+                indices = np.flatnonzero(mask)
+                for run in np.split(indices, np.flatnonzero(np.diff(indices) > 1) + 1):
+                    if len(run):
+                        selected.append((logical + int(run[0]), segment[run[0]:run[-1] + 1]))
+            return selected
+
+        for logical, segment in ordered:
+            timestamps = segment["timestamp"]
+            lo = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+            hi = len(segment) if end is None else int(np.searchsorted(timestamps, end, side="left"))
+            if hi > lo:
+                selected.append((logical + lo, segment[lo:hi]))
+        return selected
+
+    def read(self, start=None, end=None, limit=None):
+        selected = self.select(start, end)
+        if limit is not None:
+            # Trim the views first, so only what is returned gets copied.
+            trimmed = []
+            for first, view in selected:
+                if limit <= 0:
+                    break
+                trimmed.append((first, view[:limit]))
+                limit -= len(trimmed[-1][1])
+            selected = trimmed
+        if not selected:
+            return np.empty(0, dtype=self.dtype)
+        frames = np.concatenate([view for _, view in selected])
+        logical = np.concatenate([np.arange(first, first + len(view)) for first, view in selected])
+        # Drop any slot the writer lapped while we were copying.
+        valid = logical >= self.written - self.capacity
+        if not valid.all():
+            frames = frames[valid]
+        return frames
+
+    def flush(self):
+        self.records.flush()
+        self.header.flush()
@@ -0,0 +1,82 @@
+import struct
+
+import numpy as np
+
+# Binary thermal frame served by /thermal_frame:
+#   magic "TF" | version u8 | flags u8 | seq u32 | base seq u32 |
+#   timestamp f64 | minHet f32 | maxHet f32 | pixels
+# All fields are little-endian. Pixels are 192 x int16 centi-degrees, or
+# 192 x float32 with FLAG_FLOAT32. With FLAG_DELTA they are 192 x int8
+# centi-degree differences from the int16 frame with sequence "base seq",
+# which the client must still hold.
+MAGIC = b"TF"
+VERSION = 1
+HEADER = struct.Struct("<2sBBIIdff")
+FLAG_FLOAT32 = 0x01
+FLAG_DELTA = 0x02
+
+FORMAT_INT16 = "int16"
+FORMAT_FLOAT32 = "float32"
+FORMATS = (FORMAT_INT16, FORMAT_FLOAT32)
+
+
+def centi_frame(snapshot):
+    return snapshot.cached("centi", _centi)
+
+
+def _centi(snapshot):
+    centi = np.clip(np.round(snapshot.frame * 100), -32768, 32767).astype("<i2")
+    centi.flags.writeable = False
+    return centi
+
+
+def _header(snapshot, flags, base=0):
+    return HEADER.pack(MAGIC, VERSION, flags, snapshot.seq, base,
+                       snapshot.timestamp, snapshot.minHet, snapshot.maxHet)
+
+
+def encode_keyframe(snapshot, pixel_format=FORMAT_INT16):
+    return snapshot.cached(("frame", pixel_format), lambda s: _keyframe(s, pixel_format))
+
+
+def _keyframe(snapshot, pixel_format):
+    if pixel_format == FORMAT_FLOAT32:
+        return _header(snapshot, FLAG_FLOAT32) + snapshot.frame.astype("<f4").tobytes()
+    return _header(snapshot, 0) + centi_frame(snapshot).tobytes()
+
+
+def encode_delta(snapshot, base):
+    # Falls back to an int16 keyframe when a pixel moved more than an int8
+    # can carry, so the client always gets something it can apply.
+    return snapshot.cached(("delta", base.seq), lambda s: _delta(s, base))
+
+
+def _delta(snapshot, base):
+    delta = centi_frame(snapshot).astype(np.int32) - centi_frame(base)
+    if np.abs(delta).max() > 127:
+        return encode_keyframe(snapshot, FORMAT_INT16)
+    return _header(snapshot, FLAG_DELTA, base.seq) + delta.astype("i1").tobytes()
+
+
+def decode(payload, base_centi=None):
+    magic, version, flags, seq, base, timestamp, minHet, maxHet = HEADER.unpack_from(payload)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a version %d thermal frame" % VERSION)
+    body = memoryview(payload)[HEADER.size:]
+    if flags & FLAG_DELTA:
+        if base_centi is None:
+            raise ValueError("Delta frame needs the base frame %d" % base)
+        pixels = base_centi + np.frombuffer(body, dtype="i1").astype(np.int16)
+    elif flags & FLAG_FLOAT32:
+        pixels = np.frombuffer(body, dtype="<f4")
+    else:
+        pixels = np.frombuffer(body, dtype="<i2")
+    header = {
+        "seq": seq,
+        "base": base,
+        "timestamp": timestamp,
+        "minHet": minHet,
+        "maxHet": maxHet,
+        "flags": flags,
+    }
+    return header, pixels
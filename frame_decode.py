@@ -0,0 +1,98 @@
+import numpy as np
+
+PIXEL_COUNT = 192
+FRAME_WIDTH = 32
+
+# Neighbour table for dead-pixel interpolation. The conditions mirror the
+# original per-pixel loop in DataReader.run exactly (including its edge
+# handling), so the vectorized decode produces the same frame.
+NEIGHBOUR_INDEX = np.zeros((PIXEL_COUNT, 4), dtype=np.intp)
+NEIGHBOUR_MASK = np.zeros((PIXEL_COUNT, 4), dtype=bool)
+
+for _i in range(PIXEL_COUNT):
+    _col = _i % FRAME_WIDTH
+    _candidates = (
+        (_i - FRAME_WIDTH, _i - FRAME_WIDTH > 0),
+        (_i + FRAME_WIDTH, _i + FRAME_WIDTH < PIXEL_COUNT),
+        (_i - 1, _col != FRAME_WIDTH - 1),
+        (_i + 1, _i + FRAME_WIDTH < PIXEL_COUNT and _col != 0),
+    )
+    for _k, (_index, _enabled) in enumerate(_candidates):
+        NEIGHBOUR_INDEX[_i, _k] = _index % PIXEL_COUNT if _enabled else _i
+        NEIGHBOUR_MASK[_i, _k] = _enabled
+
+del _i, _col, _candidates, _k, _index, _enabled
+
+
+def _parse_pixel(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def parse_frame(hetData):
+    values = hetData[:PIXEL_COUNT]
+    try:
+        return np.array(values, dtype=np.float32)
+    except (TypeError, ValueError):
+        # A torn or garbled CSV field; treat it like a "nan" pixel.
+        return np.array([_parse_pixel(v) for v in values], dtype=np.float32)
+
+
+def interpolate_dead_pixels(frame, dead):
+    valid = ~dead
+    deadIndex = np.flatnonzero(dead)
+    neighbours = NEIGHBOUR_INDEX[deadIndex]
+    mask = NEIGHBOUR_MASK[deadIndex] & valid[neighbours]
+    count = mask.sum(axis=1)
+    total = np.where(mask, frame[neighbours], 0).sum(axis=1)
+    frame[deadIndex] = np.where(count > 0, total / np.maximum(count, 1), 0)
+    return frame
+
+
+def decode_frame(hetData, interpolated=None):
+    # interpolated, if given, is a counter (anything with inc(n)) for the
+    # number of dead pixels filled in.
+    if len(hetData) < PIXEL_COUNT:
+        return None
+
+    frame = parse_frame(hetData)
+    dead = np.isnan(frame)
+    if dead.any():
+        interpolate_dead_pixels(frame, dead)
+        if interpolated is not None:
+            interpolated.inc(int(np.count_nonzero(dead)))
+
+    maxHet = float(frame.max())
+    minHet = float(frame.min())
+    if maxHet <= 0 or minHet >= 500:
+        return None
+    return frame, minHet, maxHet
+
+
+def decode_frames(frames, interpolated=None):
+    # Batched decode_frame for frames that arrived together (e.g. from
+    # several sensors): one parse, NaN scan and min/max pass over an
+    # (n, PIXEL_COUNT) array. Every frame must have at least PIXEL_COUNT
+    # values. Returns one decode_frame result per input frame.
+    try:
+        batch = np.array([hetData[:PIXEL_COUNT] for hetData in frames], dtype=np.float32)
+    except (TypeError, ValueError):
+        batch = np.stack([parse_frame(hetData) for hetData in frames])
+
+    dead = np.isnan(batch)
+    if dead.any():
+        rows, cols = np.nonzero(dead)
+        neighbours = NEIGHBOUR_INDEX[cols]
+        mask = NEIGHBOUR_MASK[cols] & ~dead[rows[:, None], neighbours]
+        count = mask.sum(axis=1)
+        total = np.where(mask, batch[rows[:, None], neighbours], 0).sum(axis=1)
+        batch[rows, cols] = np.where(count > 0, total / np.maximum(count, 1), 0)
+        if interpolated is not None:
+            interpolated.inc(len(rows))
+
+    maxima = batch.max(axis=1).tolist()
+    minima = batch.min(axis=1).tolist()
+    return [None if maxHet <= 0 or minHet >= 500 else (frame, minHet, maxHet)
+            for frame, minHet, maxHet in zip(batch, minima, maxima)]
@@ -0,0 +1,213 @@
+import math
+import time
+
+import numpy as np
+
+from frame_decode import PIXEL_COUNT, FRAME_WIDTH
+from serial_protocol import SerialFrameReader
+
+FRAME_HEIGHT = PIXEL_COUNT // FRAME_WIDTH
+
+
+# A frame source returns one raw frame per read(): a sequence of at least
+# PIXEL_COUNT values as DataReader's decode stage expects them (floats,
+# CSV fields or NaN for dead pixels), or an empty sequence when nothing
+# usable arrived. The caller owns the returned frame; a source must not
+# reuse it for the next read. Sources whose frame rate can be changed while
+# running also have set_rate(fps), called from the reading thread.
+class FrameSource:
+    def read(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class Pacer:
+    # Sleeps between frames to hold a target rate; fps of 0 runs unthrottled.
+    def __init__(self, fps):
+        self.interval = 1 / fps if fps else 0
+        self.deadline = None
+
+    def wait(self, interval=None):
+        interval = self.interval if interval is None else interval
+        if not interval:
+            return
+        now = time.monotonic()
+        if self.deadline is None or self.deadline < now - interval:
+            self.deadline = now
+        self.deadline += interval
+        delay = self.deadline - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def refresh_rate_name(fps):
+    # 0.5 -> "REFRESH_0_5_HZ", 8 -> "REFRESH_8_HZ", as in seeed_mlx9064x.RefreshRate.
+    return "REFRESH_%s_HZ" % ("%g" % fps).replace(".", "_")
+
+
+class I2CSource(FrameSource):
+    def __init__(self, refresh_rate="REFRESH_8_HZ", address=None):
+        # Imported here so the other sources work on machines without the
+        # sensor driver installed.
+        import seeed_mlx9064x
+        self.rates = seeed_mlx9064x.RefreshRate
+        if address is None:
+            self.dataHandle = seeed_mlx9064x.grove_mxl90641()
+        else:
+            self.dataHandle = seeed_mlx9064x.grove_mxl90641(address)
+        self.dataHandle.refresh_rate = getattr(self.rates, refresh_rate)
+
+    def set_rate(self, fps):
+        # 16 Hz and above need the I2C bus at 400 kHz or faster.
+        name = refresh_rate_name(fps)
+        if not hasattr(self.rates, name):
+            raise ValueError(f"The MLX90641 has no {fps:g} Hz refresh rate")
+        self.dataHandle.refresh_rate = getattr(self.rates, name)
+
+    def read(self):
+        frame = [0] * PIXEL_COUNT
+        self.dataHandle.getFrame(frame)
+        return frame
+
+
+class SerialSource(FrameSource):
+    def __init__(self, port, protocol="auto", baud_rate=2000000):
+        from serial import Serial
+        self.port = port
+        self.dataHandle = Serial(port, baud_rate, timeout=5)
+        self.frameReader = SerialFrameReader(self.dataHandle, protocol)
+
+    @property
+    def stats(self):
+        return self.frameReader.stats
+
+    def read(self):
+        return self.frameReader.read()
+
+    def close(self):
+        self.dataHandle.close()
+
+
+class ReplaySource(FrameSource):
+    # Replays a frame archive (.ring) or a capture of the bridge's CSV
+    # lines. With fps=None archive frames keep their recorded timing; CSV
+    # captures carry no timestamps and play at 8 fps.
+    def __init__(self, path, fps=None, loop=True):
+        self.path = path
+        self.loop = loop
+        if path.endswith(".ring"):
+            from frame_archive import FrameArchive
+            archive = FrameArchive.open(path)
+            records = archive.read()
+            scale = 100 if archive.pixel_format == "int16" else 1
+            self.frames = (records["pixels"] / scale).astype(np.float32)
+            gaps = np.diff(records["timestamp"], prepend=records["timestamp"][:1])
+            self.intervals = np.clip(gaps, 0, 1).tolist() if fps is None else None
+        else:
+            with open(path) as capture:
+                self.frames = [line.rstrip("\r\n").split(",")[:-1] for line in capture if line.strip()]
+            self.intervals = None
+            if fps is None:
+                fps = 8
+        self.pacer = Pacer(fps)
+        self.index = 0
+
+    def __len__(self):
+        return len(self.frames)
+
+    def read(self):
+        if self.index >= len(self.frames):
+            if not self.loop or not len(self.frames):
+                time.sleep(0.1)
+                return []
+            self.index = 0
+        self.pacer.wait(self.intervals[self.index] if self.intervals else None)
+        frame = self.frames[self.index]
+        self.index += 1
+        return frame
+
+
+class SyntheticSource(FrameSource):
+    # Generates frames of a pen: a cool background with sensor noise, a
+    # few warm blobs (chicks) drifting around, dead pixels, and fever
+    # events in which one blob heats past the alarm threshold for a while.
+    def __init__(self, fps=8, blobs=3, background=27.0, body=38.5, fever=41.5,
+                 noise=0.15, nan_rate=0.005, fever_rate=1.0, fever_duration=10.0, seed=None):
+        self.pacer = Pacer(fps)
+        self.fps = fps or 8
+        self.rng = np.random.default_rng(seed)
+        self.background = background
+        self.body = body
+        self.fever = fever
+        self.noise = noise
+        self.nan_rate = nan_rate
+        # Fever events per minute of generated time.
+        self.fever_rate = fever_rate
+        self.fever_frames = int(fever_duration * self.fps)
+        self.feverLeft = 0
+        self.feverBlob = 0
+
+        rows, cols = np.divmod(np.arange(PIXEL_COUNT), FRAME_WIDTH)
+        self.rows = rows.astype(np.float32)
+        self.cols = cols.astype(np.float32)
+        self.centres = self.rng.uniform((0, 0), (FRAME_HEIGHT, FRAME_WIDTH), size=(blobs, 2))
+        self.velocity = self.rng.normal(0, 0.05, size=(blobs, 2))
+        self.radius = self.rng.uniform(1.2, 2.2, size=blobs)
+        self.frame = np.empty(PIXEL_COUNT, dtype=np.float32)
+
+    def set_rate(self, fps):
+        self.pacer.interval = 1 / fps if fps else 0
+
+    @property
+    def feverActive(self):
+        return self.feverLeft > 0
+
+    def read(self):
+        self.pacer.wait()
+        self.step()
+
+        peaks = np.full(len(self.centres), self.body - self.background)
+        if self.feverLeft:
+            peaks[self.feverBlob] = self.fever - self.background
+            self.feverLeft -= 1
+
+        dy = self.rows[:, None] - self.centres[:, 0]
+        dx = self.cols[:, None] - self.centres[:, 1]
+        heat = np.exp(-(dx * dx + dy * dy) / (2 * self.radius ** 2))
+        frame = self.frame
+        frame[:] = self.background + (heat * peaks).max(axis=1)
+        frame += self.rng.normal(0, self.noise, PIXEL_COUNT)
+        if self.nan_rate:
+            frame[self.rng.random(PIXEL_COUNT) < self.nan_rate] = np.nan
+        return frame.copy()
+
+    def step(self):
+        self.centres += self.velocity
+        for axis, limit in enumerate((FRAME_HEIGHT - 1, FRAME_WIDTH - 1)):
+            outside = (self.centres[:, axis] < 0) | (self.centres[:, axis] > limit)
+            self.velocity[outside, axis] *= -1
+            np.clip(self.centres[:, axis], 0, limit, out=self.centres[:, axis])
+
+        if not self.feverLeft and self.fever_rate:
+            chance = -math.expm1(-self.fever_rate / (60 * self.fps))
+            if self.rng.random() < chance:
+                self.feverLeft = self.fever_frames
+                self.feverBlob = int(self.rng.integers(len(self.centres)))
+
+
+def open_source(spec, protocol="auto"):
+    # "i2c[:address]", "synthetic[:fps]", "replay:<path>[@fps]", or anything
+    # else as a serial port name (the original [PortName] argument).
+    if spec is None or spec.lower() == "i2c":
+        return I2CSource()
+    if spec.lower().startswith("i2c:"):
+        return I2CSource(address=int(spec[len("i2c:"):], 0))
+    if spec.startswith("synthetic"):
+        _, _, fps = spec.partition(":")
+        return SyntheticSource(fps=float(fps) if fps else 8)
+    if spec.startswith("replay:"):
+        path, _, fps = spec[len("replay:"):].partition("@")
+        return ReplaySource(path, fps=float(fps) if fps else None)
+    return SerialSource(spec, protocol)
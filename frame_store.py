@@ -0,0 +1,122 @@
+import collections
+import json
+import time
+
+import numpy as np
+
+
+class FrameSnapshot:
+    # frame is what every consumer sees; raw, when a temporal filter is on,
+    # is the unfiltered frame it was computed from.
+    __slots__ = ("seq", "timestamp", "frame", "minHet", "maxHet", "raw", "_cache")
+
+    def __init__(self, seq, timestamp, frame, minHet, maxHet, raw=None):
+        frame = np.asarray(frame, dtype=np.float32)
+        frame.flags.writeable = False
+        if raw is not None:
+            raw = np.asarray(raw, dtype=np.float32)
+            raw.flags.writeable = False
+        object.__setattr__(self, "seq", seq)
+        object.__setattr__(self, "timestamp", timestamp)
+        object.__setattr__(self, "frame", frame)
+        object.__setattr__(self, "minHet", minHet)
+        object.__setattr__(self, "maxHet", maxHet)
+        object.__setattr__(self, "raw", raw)
+        object.__setattr__(self, "_cache", {})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FrameSnapshot is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("FrameSnapshot is immutable")
+
+    def __bool__(self):
+        return self.seq > 0
+
+    def average(self):
+        return float(self.frame.mean()) if self.frame.size else 0.0
+
+    def to_dict(self):
+        return {
+            "frame": self.frame.tolist(),
+            "maxHet": self.maxHet,
+            "minHet": self.minHet,
+        }
+
+    def cached(self, key, build):
+        # Derived encodings are built lazily on the first request for this
+        # frame and reused by every later one. Two requests racing here just
+        # build the same value twice.
+        value = self._cache.get(key)
+        if value is None:
+            value = build(self)
+            self._cache[key] = value
+        return value
+
+    def to_json(self, raw=False):
+        if raw and self.raw is not None:
+            return self.cached("raw_json", _encode_raw_json)
+        return self.cached("json", _encode_json)
+
+
+def _encode_json(snapshot):
+    return json.dumps(snapshot.to_dict(), separators=(",", ":")).encode()
+
+
+def _encode_raw_json(snapshot):
+    raw = snapshot.raw
+    return json.dumps({
+        "frame": raw.tolist(),
+        "maxHet": float(raw.max()),
+        "minHet": float(raw.min()),
+    }, separators=(",", ":")).encode()
+
+
+EMPTY_SNAPSHOT = FrameSnapshot(0, 0.0, [], 0, 0)
+
+
+class FrameStore:
+    # Single writer (the acquisition thread), any number of readers. A new
+    # snapshot is built completely before the reference is swapped, and
+    # snapshots are never mutated, so readers need no lock and never see
+    # fields from two different frames.
+    def __init__(self, history=32):
+        self.current = EMPTY_SNAPSHOT
+        self.history = collections.deque(maxlen=history)
+        # Sequence numbers restart with the process, so tag them with the
+        # start time to keep ETags from a previous run from matching.
+        self.epoch = "%x" % int(time.time())
+        self.listeners = []
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def publish(self, frame, minHet, maxHet, timestamp=None, raw=None):
+        if timestamp is None:
+            timestamp = time.time()
+        snapshot = FrameSnapshot(self.current.seq + 1, timestamp, frame, minHet, maxHet, raw)
+        self.history.append(snapshot)
+        self.current = snapshot
+        for callback in self.listeners:
+            callback(snapshot)
+        return snapshot
+
+    def restore(self, frame, minHet, maxHet, timestamp):
+        # Shows a frame saved by a previous run until the first live one.
+        # It has seq 0, so it is falsy: it is served but never logged or
+        # passed to listeners.
+        self.current = FrameSnapshot(0, timestamp, frame, minHet, maxHet)
+
+    def latest(self):
+        return self.current
+
+    def find(self, seq):
+        for snapshot in reversed(tuple(self.history)):
+            if snapshot.seq == seq:
+                return snapshot
+            if snapshot.seq < seq:
+                break
+        return None
+
+    def etag(self, snapshot, raw=False):
+        return f"{self.epoch}-{snapshot.seq}-raw" if raw else f"{self.epoch}-{snapshot.seq}"
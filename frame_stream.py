@@ -0,0 +1,74 @@
+import collections
+import threading
+
+
+class FrameSubscriber:
+    # Bounded per-client queue. When the client falls behind, the oldest
+    # frame is dropped so it always catches up to the newest one.
+    def __init__(self, queue_size):
+        self.frames = collections.deque(maxlen=queue_size)
+        self.event = threading.Event()
+        self.delivered = 0
+        self.dropped = 0
+
+    def push(self, snapshot):
+        if len(self.frames) == self.frames.maxlen:
+            self.dropped += 1
+        self.frames.append(snapshot)
+        self.event.set()
+
+    def get(self, timeout=None):
+        while True:
+            try:
+                snapshot = self.frames.popleft()
+                self.delivered += 1
+                return snapshot
+            except IndexError:
+                pass
+            self.event.clear()
+            if self.frames:
+                continue
+            if not self.event.wait(timeout):
+                return None
+
+
+class FrameBroadcaster:
+    def __init__(self, queue_size=2):
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        # Replaced, never mutated, so publish can iterate it without the lock.
+        self.subscribers = ()
+        self.published = 0
+        self.closedDelivered = 0
+        self.closedDropped = 0
+
+    def subscribe(self):
+        subscriber = FrameSubscriber(self.queue_size)
+        with self.lock:
+            self.subscribers = self.subscribers + (subscriber,)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            if subscriber not in self.subscribers:
+                return
+            self.subscribers = tuple(s for s in self.subscribers if s is not subscriber)
+            self.closedDelivered += subscriber.delivered
+            self.closedDropped += subscriber.dropped
+
+    def publish(self, snapshot):
+        self.published += 1
+        for subscriber in self.subscribers:
+            subscriber.push(snapshot)
+
+    def stats(self):
+        with self.lock:
+            subscribers = self.subscribers
+            delivered = self.closedDelivered
+            dropped = self.closedDropped
+        return {
+            "subscribers": len(subscribers),
+            "published": self.published,
+            "delivered": delivered + sum(s.delivered for s in subscribers),
+            "dropped": dropped + sum(s.dropped for s in subscribers),
+        }
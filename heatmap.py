@@ -0,0 +1,130 @@
+import functools
+import io
+import struct
+import zlib
+
+import numpy as np
+
+from frame_decode import PIXEL_COUNT
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# The MLX90641 is 16 x 12 pixels, drawn row by row as in the dashboard and
+# the Qt viewer.
+IMAGE_COLUMNS = 16
+IMAGE_ROWS = PIXEL_COUNT // IMAGE_COLUMNS
+LUT_SIZE = 256
+# Largest Gaussian blur sigma, in source pixels, for /thermal_image and
+# the heatmap_blur setting.
+MAX_BLUR = 4
+
+FORMAT_PNG = "png"
+FORMAT_JPEG = "jpeg"
+IMAGE_FORMATS = (FORMAT_PNG, FORMAT_JPEG) if Image is not None else (FORMAT_PNG,)
+MIMETYPES = {FORMAT_PNG: "image/png", FORMAT_JPEG: "image/jpeg"}
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def mapValue(value, curMin, curMax, desMin, desMax):
+    if curMin == curMax:
+        return (desMax + desMin) / 2
+    return desMin + (desMax - desMin) * (value - curMin) / (curMax - curMin)
+
+
+def constrain(value, down, up):
+    value = up if value > up else value
+    value = down if value < down else value
+    return value
+
+
+def hsv_to_rgb(hue):
+    # Full saturation and value, as QColor.setHsvF(hue / 360, 1.0, 1.0).
+    sector = (np.asarray(hue, dtype=np.float64) % 360) / 60
+    x = 1 - np.abs(sector % 2 - 1)
+    index = sector.astype(int) % 6
+    one = np.ones_like(x)
+    zero = np.zeros_like(x)
+    r = np.choose(index, [one, x, zero, zero, x, one])
+    g = np.choose(index, [x, one, one, x, zero, zero])
+    b = np.choose(index, [zero, zero, x, one, one, x])
+    return np.round(np.stack([r, g, b], axis=-1) * 255).astype(np.uint8)
+
+
+@functools.lru_cache(maxsize=8)
+def build_lut(min_hue, max_hue, size=LUT_SIZE):
+    # Entry i is the colour of a pixel i / (size - 1) of the way from the
+    # frame's minimum to its maximum, through the viewers' hue mapping.
+    hues = [constrain(mapValue(i, 0, size - 1, min_hue, max_hue), min_hue, max_hue) for i in range(size)]
+    lut = hsv_to_rgb(hues)
+    lut.flags.writeable = False
+    return lut
+
+
+@functools.lru_cache(maxsize=16)
+def resample_matrix(length, scale, blur):
+    # Maps `length` source pixels to length * scale output pixels: linear
+    # interpolation, or Gaussian weights with sigma `blur` source pixels,
+    # the server-side version of the dashboard's feGaussianBlur.
+    centres = (np.arange(length * scale) + 0.5) / scale - 0.5
+    distance = centres[:, None] - np.arange(length)[None, :]
+    if blur > 0:
+        weights = np.exp(-distance ** 2 / (2 * blur ** 2))
+    else:
+        weights = np.maximum(0, 1 - np.abs(distance))
+    weights /= weights.sum(axis=1, keepdims=True)
+    weights.flags.writeable = False
+    return weights.astype(np.float32)
+
+
+def render_heatmap(snapshot, min_hue, max_hue, scale, blur):
+    # Upscale and smooth the temperatures, then colour them through the LUT.
+    grid = snapshot.frame.reshape(IMAGE_ROWS, IMAGE_COLUMNS)
+    field = resample_matrix(IMAGE_ROWS, scale, blur) @ grid @ resample_matrix(IMAGE_COLUMNS, scale, blur).T
+    span = snapshot.maxHet - snapshot.minHet
+    if span > 0:
+        index = (field - snapshot.minHet) * ((LUT_SIZE - 1) / span)
+        np.clip(index, 0, LUT_SIZE - 1, out=index)
+        index = np.rint(index).astype(np.intp)
+    else:
+        index = np.full(field.shape, LUT_SIZE // 2, dtype=np.intp)
+    return build_lut(min_hue, max_hue)[index]
+
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def encode_png(rgb, level=6):
+    height, width, _ = rgb.shape
+    # Each scanline starts with filter type 0 (none).
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 1:] = rgb.reshape(height, width * 3)
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (PNG_SIGNATURE
+            + _png_chunk(b"IHDR", header)
+            + _png_chunk(b"IDAT", zlib.compress(rows.tobytes(), level))
+            + _png_chunk(b"IEND", b""))
+
+
+def encode_jpeg(rgb, quality=85):
+    if Image is None:
+        raise RuntimeError("JPEG output needs Pillow")
+    output = io.BytesIO()
+    Image.fromarray(rgb, "RGB").save(output, "JPEG", quality=quality)
+    return output.getvalue()
+
+
+def heatmap_image(snapshot, image_format, min_hue, max_hue, scale, blur, cache=True):
+    # Rendered once per frame and settings; every viewer after the first
+    # gets the cached bytes. Pass cache=False for one-off settings, so
+    # they do not pile up on the snapshot.
+    def build(snapshot):
+        rgb = render_heatmap(snapshot, min_hue, max_hue, scale, blur)
+        return encode_jpeg(rgb) if image_format == FORMAT_JPEG else encode_png(rgb)
+    if not cache:
+        return build(snapshot)
+    return snapshot.cached(("heatmap", image_format, min_hue, max_hue, scale, blur), build)
@@ -0,0 +1,186 @@
+import collections
+import json
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import func, literal, literal_column, select, union_all
+
+from storage import FeverLog, MonitorLog
+
+BUCKET_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+FETCH_SIZE = 500
+
+
+def parse_bucket(value):
+    # Seconds, or a count with a unit: "90", "5m", "1h", "1d", "1w".
+    value = str(value).strip().lower()
+    unit = BUCKET_UNITS.get(value[-1:])
+    try:
+        seconds = int(value[:-1]) * unit if unit else int(value)
+    except ValueError:
+        raise ValueError(f"Invalid bucket '{value}'")
+    if seconds <= 0:
+        raise ValueError("bucket must be positive")
+    return seconds
+
+
+def parse_time(value):
+    # Unix seconds, or an ISO 8601 timestamp (UTC unless it has an offset).
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid time '{value}'")
+    if moment.tzinfo is None:
+        return (moment - datetime(1970, 1, 1)).total_seconds()
+    return moment.timestamp()
+
+
+def align(timestamp, bucket, offset, up=False):
+    # Bucket boundaries are multiples of `bucket` in local time, where local
+    # time is UTC shifted by `offset` seconds.
+    index = (timestamp + offset) // bucket
+    if up and index * bucket != timestamp + offset:
+        index += 1
+    return int(index * bucket - offset)
+
+
+def bucket_column(column, bucket, offset):
+    # bucket and offset are validated integers, so they can be inlined.
+    return literal_column(f"(CAST(strftime('%s', {column.table.name}.{column.name}) AS INTEGER) + {offset})"
+                          f" / {bucket} * {bucket} - {offset}")
+
+
+def history_statement(start, end, bucket, offset=0, sensor_id=None):
+    # Both halves are range scans on the time column indexes; the outer
+    # query merges the monitor and fever buckets into one row each.
+    startAt = datetime.utcfromtimestamp(start)
+    endAt = datetime.utcfromtimestamp(end)
+    monitor = MonitorLog.__table__
+    fever = FeverLog.__table__
+
+    monitorBucket = bucket_column(monitor.c.logged_at, bucket, offset)
+    monitorRows = (select(monitorBucket.label("bucket"),
+                          func.count().label("samples"),
+                          func.min(monitor.c.min_temperature).label("minimum"),
+                          func.max(monitor.c.max_temperature).label("maximum"),
+                          func.sum(monitor.c.avg_temperature).label("total"),
+                          literal(0).label("fevers"))
+                   .where(monitor.c.logged_at >= startAt, monitor.c.logged_at < endAt)
+                   .group_by(monitorBucket))
+
+    feverBucket = bucket_column(fever.c.detected_at, bucket, offset)
+    feverRows = (select(feverBucket.label("bucket"),
+                        literal(0).label("samples"),
+                        literal(None).label("minimum"),
+                        literal(None).label("maximum"),
+                        literal(0).label("total"),
+                        func.count().label("fevers"))
+                 .where(fever.c.detected_at >= startAt, fever.c.detected_at < endAt)
+                 .group_by(feverBucket))
+
+    if sensor_id is not None:
+        monitorRows = monitorRows.where(monitor.c.sensor_id == sensor_id)
+        feverRows = feverRows.where(fever.c.sensor_id == sensor_id)
+
+    merged = union_all(monitorRows, feverRows).subquery()
+    return (select(merged.c.bucket,
+                   func.sum(merged.c.samples),
+                   func.min(merged.c.minimum),
+                   func.max(merged.c.maximum),
+                   func.sum(merged.c.total),
+                   func.sum(merged.c.fevers))
+            .group_by(merged.c.bucket)
+            .order_by(merged.c.bucket))
+
+
+class HistoryCache:
+    # Buckets that ended more than `grace` seconds ago (long enough for the
+    # write-behind buffer to have flushed them) never change, so the closed
+    # part of a query is cached and only the open tail is read again. Polls
+    # with a moving "to" hit the cache until the next bucket closes. Rows
+    # are yielded, and cached, already encoded as JSON objects.
+    def __init__(self, engine, grace=5.0, max_entries=64, max_rows=10000):
+        self.engine = engine
+        self.grace = grace
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def buckets(self, start, end, bucket, offset=0, sensor_id=None, now=None):
+        if now is None:
+            now = time.time()
+        start = align(start, bucket, offset)
+        end = align(end, bucket, offset, up=True)
+        closedEnd = max(start, min(end, align(now - self.grace, bucket, offset)))
+
+        if closedEnd > start:
+            key = (start, closedEnd, bucket, offset, sensor_id)
+            with self.lock:
+                rows = self.entries.get(key)
+                if rows is not None:
+                    self.entries.move_to_end(key)
+            if rows is not None:
+                self.stats["hits"] += 1
+                yield from rows
+            else:
+                self.stats["misses"] += 1
+                yield from self.collect(key)
+        if end > closedEnd:
+            yield from self.query(closedEnd, end, bucket, offset, sensor_id)
+
+    def collect(self, key):
+        # Streams the closed range and caches it unless it is too large.
+        rows = []
+        for row in self.query(*key):
+            if rows is not None:
+                rows.append(row)
+                if len(rows) > self.max_rows:
+                    rows = None
+            yield row
+        if rows is not None:
+            with self.lock:
+                self.entries[key] = rows
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+
+    def query(self, start, end, bucket, offset, sensor_id):
+        with self.engine.connect() as connection:
+            result = connection.execute(history_statement(start, end, bucket, offset, sensor_id))
+            while True:
+                rows = result.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                for bucketStart, samples, minimum, maximum, total, fevers in rows:
+                    yield json.dumps({
+                        "start": bucketStart,
+                        "samples": samples,
+                        "min_temperature": minimum,
+                        "max_temperature": maximum,
+                        "avg_temperature": total / samples if samples else None,
+                        "fevers": fevers,
+                    }, separators=(",", ":"))
+
+
+def stream_json(header, rows, chunk=200):
+    # {...header, "buckets": [rows]} in chunks, so large ranges never sit
+    # in memory as one document. rows are JSON-encoded strings.
+    opening = json.dumps(header, separators=(",", ":"))[:-1]
+    yield (opening + (',"buckets":[' if header else '{"buckets":[')).encode()
+    batch = []
+    first = True
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk:
+            yield (("" if first else ",") + ",".join(batch)).encode()
+            first = False
+            batch = []
+    if batch:
+        yield (("" if first else ",") + ",".join(batch)).encode()
+    yield b"]}"
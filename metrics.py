@@ -0,0 +1,208 @@
+import bisect
+import collections
+import threading
+import time
+
+# Minimal Prometheus instrumentation, cheap enough for the acquisition
+# loop: counters, gauges and fixed-bucket histograms, plus callback
+# metrics that read existing stats dicts only when /metrics is scraped.
+# Updates rely on the GIL rather than locks, so a count can very rarely
+# miss an increment under contention; that is fine for monitoring.
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join('%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                    for name, value in pairs)
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class GaugeValue(CounterValue):
+    __slots__ = ()
+
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+
+class HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+        if not self.labelnames:
+            self.children[()] = self.newChild()
+
+    def newChild(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self.newChild())
+        return child
+
+    def render(self):
+        lines = ["# HELP %s %s" % (self.name, self.help), "# TYPE %s %s" % (self.name, self.type)]
+        for values, child in list(self.children.items()):
+            lines.extend(self.renderChild(values, child))
+        return lines
+
+    def renderChild(self, values, child):
+        return ["%s%s %s" % (self.name, _format_labels(self.labelnames, values), _format_value(child.value))]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def newChild(self):
+        return CounterValue()
+
+    def inc(self, amount=1):
+        self.children[()].inc(amount)
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def newChild(self):
+        return GaugeValue()
+
+    def set(self, value):
+        self.children[()].set(value)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super(Histogram, self).__init__(name, help, labelnames)
+
+    def newChild(self):
+        return HistogramValue(self.bounds)
+
+    def observe(self, value):
+        self.children[()].observe(value)
+
+    def renderChild(self, values, child):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float("inf"),), list(child.counts)):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, [("le", _format_value(bound))])
+            lines.append("%s_bucket%s %d" % (self.name, labels, cumulative))
+        labels = _format_labels(self.labelnames, values)
+        lines.append("%s_sum%s %s" % (self.name, labels, _format_value(child.sum)))
+        lines.append("%s_count%s %d" % (self.name, labels, child.count))
+        return lines
+
+
+class CallbackMetric(Metric):
+    # The callback returns a number, or a dict mapping label-value tuples
+    # to numbers. It runs only at scrape time.
+    def __init__(self, name, help, type, callback, labelnames=()):
+        self.type = type
+        self.callback = callback
+        super(CallbackMetric, self).__init__(name, help, labelnames)
+
+    def newChild(self):
+        return None
+
+    def render(self):
+        lines = ["# HELP %s %s" % (self.name, self.help), "# TYPE %s %s" % (self.name, self.type)]
+        value = self.callback()
+        if value is None:
+            return lines
+        if not isinstance(value, dict):
+            value = {(): value}
+        for values, sample in value.items():
+            lines.append("%s%s %s" % (self.name, _format_labels(self.labelnames, values), _format_value(sample)))
+        return lines
+
+
+class RateMeter:
+    # Events per second over a sliding window of recent timestamps.
+    def __init__(self, window=5.0, maxlen=4096):
+        self.window = window
+        self.times = collections.deque(maxlen=maxlen)
+
+    def tick(self, now=None):
+        self.times.append(time.monotonic() if now is None else now)
+
+    def rate(self, now=None):
+        now = time.monotonic() if now is None else now
+        times = [t for t in tuple(self.times) if now - t <= self.window]
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name, help, type, callback, labelnames=()):
+        return self.register(CallbackMetric(name, help, type, callback, labelnames))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
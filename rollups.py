@@ -0,0 +1,138 @@
+import logging
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from storage import Rollup1s, Rollup1m, Rollup1h
+
+logger = logging.getLogger(__name__)
+
+# Each level summarises the closed buckets of the level before it, so the
+# 1 min and 1 h rows are built incrementally and never re-read from disk.
+RESOLUTIONS = (
+    (1, Rollup1s.__table__),
+    (60, Rollup1m.__table__),
+    (3600, Rollup1h.__table__),
+)
+
+RETENTION = {
+    "rollup_1s": 24 * 3600,
+    "rollup_1m": 30 * 24 * 3600,
+    "rollup_1h": 365 * 24 * 3600,
+}
+
+
+def upsert_statement(table):
+    # Merges into an existing bucket, so a partial bucket written at shutdown
+    # is completed rather than duplicated after a restart.
+    statement = sqlite_insert(table)
+    excluded = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.bucket_start],
+        set_={
+            "frames": table.c.frames + excluded.frames,
+            "sum_temperature": table.c.sum_temperature + excluded.sum_temperature,
+            "min_temperature": func.min(table.c.min_temperature, excluded.min_temperature),
+            "max_temperature": func.max(table.c.max_temperature, excluded.max_temperature),
+            "fever_pixels": table.c.fever_pixels + excluded.fever_pixels,
+            "fever_frames": table.c.fever_frames + excluded.fever_frames,
+        },
+    )
+
+
+class RollupBucket:
+    __slots__ = ("start", "frames", "total", "minimum", "maximum", "feverPixels", "feverFrames")
+
+    def __init__(self, start):
+        self.start = start
+        self.frames = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.feverPixels = 0
+        self.feverFrames = 0
+
+    def merge(self, other):
+        self.frames += other.frames
+        self.total += other.total
+        if self.minimum is None or other.minimum < self.minimum:
+            self.minimum = other.minimum
+        if self.maximum is None or other.maximum > self.maximum:
+            self.maximum = other.maximum
+        self.feverPixels += other.feverPixels
+        self.feverFrames += other.feverFrames
+
+    def row(self):
+        return {
+            "bucket_start": datetime.utcfromtimestamp(self.start),
+            "frames": self.frames,
+            "sum_temperature": self.total,
+            "min_temperature": self.minimum,
+            "max_temperature": self.maximum,
+            "fever_pixels": self.feverPixels,
+            "fever_frames": self.feverFrames,
+        }
+
+
+class RollupAggregator:
+    # Fed every published frame from the acquisition thread; write(statement,
+    # row) is expected to be cheap and non-blocking (the write-behind buffer).
+    def __init__(self, write, threshold, resolutions=RESOLUTIONS):
+        self.write = write
+        self.threshold = threshold
+        self.levels = [[resolution, upsert_statement(table), None] for resolution, table in resolutions]
+
+    def add(self, snapshot):
+        if not snapshot.frame.size:
+            return
+        bucket = RollupBucket(snapshot.timestamp)
+        bucket.frames = 1
+        bucket.total = snapshot.average()
+        bucket.minimum = snapshot.minHet
+        bucket.maximum = snapshot.maxHet
+        bucket.feverPixels = int(np.count_nonzero(snapshot.frame > self.threshold))
+        bucket.feverFrames = 1 if bucket.feverPixels else 0
+        self.merge(0, bucket)
+
+    def merge(self, level, bucket):
+        resolution = self.levels[level][0]
+        start = int(bucket.start // resolution) * resolution
+        current = self.levels[level][2]
+        if current is not None and current.start != start:
+            self.close(level)
+            current = None
+        if current is None:
+            current = RollupBucket(start)
+            self.levels[level][2] = current
+        current.merge(bucket)
+
+    def close(self, level):
+        statement, bucket = self.levels[level][1:]
+        if bucket is None:
+            return
+        self.levels[level][2] = None
+        self.write(statement, bucket.row())
+        if level + 1 < len(self.levels):
+            self.merge(level + 1, bucket)
+
+    def flush(self):
+        # Writes the partial buckets, e.g. on shutdown.
+        for level in range(len(self.levels)):
+            self.close(level)
+
+
+def prune_rollups(engine, retention=RETENTION, now=None):
+    if now is None:
+        now = time.time()
+    with engine.begin() as connection:
+        for _, table in RESOLUTIONS:
+            keep = retention.get(table.name)
+            if keep is None:
+                continue
+            cutoff = datetime.utcfromtimestamp(now - keep)
+            result = connection.execute(delete(table).where(table.c.bucket_start < cutoff))
+            if result.rowcount:
+                logger.info(f"Pruned {result.rowcount} rows from {table.name}.")
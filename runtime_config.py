@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import threading
+
+from heatmap import MAX_BLUR
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(kind, low, high):
+    def parse(key, value):
+        # bool is an int, but never a valid setting.
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{key} must be a number")
+        if kind is int:
+            if value != int(value):
+                raise ValueError(f"{key} must be a whole number")
+            value = int(value)
+        else:
+            value = float(value)
+        if not low <= value <= high:
+            raise ValueError(f"{key} must be between {low} and {high}")
+        return value
+    return parse
+
+
+# Settings that can change while running, and their valid ranges. Anything
+# else (ports, sources, buffer and archive sizes) needs a restart.
+RELOADABLE = {
+    "temperature_threshold": _setting(float, 30, 45),
+    "check_interval": _setting(float, 1, 3600),
+    "buzzer_duration": _setting(float, 0, 30),
+    "min_hue": _setting(int, 0, 360),
+    "max_hue": _setting(int, 0, 360),
+    "fever_persistence_frames": _setting(int, 1, 1000),
+    "fever_clear_frames": _setting(int, 1, 1000),
+    "fever_hysteresis": _setting(float, 0, 10),
+    "fever_cooldown": _setting(float, 0, 3600),
+    "actuator_debounce": _setting(float, 0, 60),
+    "actuator_rate_limit": _setting(int, 1, 1000),
+    "actuator_rate_window": _setting(float, 1, 3600),
+    "decode_batch_ms": _setting(float, 0, 100),
+    "heatmap_scale": _setting(int, 1, 1000),
+    "heatmap_blur": _setting(float, 0, MAX_BLUR),
+}
+
+
+def validate_config(changes, config):
+    # Returns a new config with `changes` applied, or raises ValueError
+    # without touching anything: a change is applied whole or not at all.
+    if not isinstance(changes, dict):
+        raise ValueError("config changes must be a JSON object")
+    updated = dict(config)
+    for key, value in changes.items():
+        if key not in RELOADABLE:
+            if key in config:
+                raise ValueError(f"{key} cannot be changed without a restart")
+            raise ValueError(f"Unknown setting '{key}'")
+        updated[key] = RELOADABLE[key](key, value)
+    if updated["min_hue"] >= updated["max_hue"]:
+        raise ValueError("min_hue must be below max_hue")
+    if updated["heatmap_scale"] > updated["heatmap_max_scale"]:
+        raise ValueError(f"heatmap_scale must be at most {updated['heatmap_max_scale']}")
+    return updated
+
+
+def reloadable_config(config):
+    return {key: config[key] for key in RELOADABLE}
+
+
+class ConfigWatcher(threading.Thread):
+    # Polls a JSON file of reloadable settings and passes its contents to
+    # apply(changes, source) whenever it changes. A half-written or invalid
+    # file is logged and skipped; the next write is picked up as usual.
+    def __init__(self, path, apply, interval=2.0):
+        super(ConfigWatcher, self).__init__(daemon=True)
+        self.path = path
+        self.apply = apply
+        self.interval = interval
+        self.version = None
+        self.stopping = threading.Event()
+
+    def check(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self.version = None
+            return False
+        version = (stat.st_mtime_ns, stat.st_size)
+        if version == self.version:
+            return False
+        self.version = version
+        try:
+            with open(self.path) as config_file:
+                changes = json.load(config_file)
+            self.apply(changes, self.path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring {self.path}: {e}")
+            return False
+        return True
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Failed to reload {self.path}: {e}")
+
+    def stop(self):
+        self.stopping.set()
+        self.join()
@@ -0,0 +1,75 @@
+import json
+import time
+
+from frame_store import FrameStore
+from metrics import RateMeter
+
+
+class Sensor:
+    # One thermal camera: its frame source, its own frame store and the
+    # fever detector watching it.
+    def __init__(self, sensor_id, spec, source, frame_store=None):
+        self.sensor_id = sensor_id
+        self.spec = spec
+        self.source = source
+        self.frame_store = frame_store if frame_store is not None else FrameStore()
+        self.frame_rate = RateMeter()
+        self.detector = None
+        # Optional temporal_filter stage applied between decode and publish.
+        self.filter = None
+        # Optional adaptive_rate controller; DataReader applies its rate.
+        self.rate_controller = None
+
+    def describe(self):
+        snapshot = self.frame_store.latest()
+        return {
+            "id": self.sensor_id,
+            "source": self.spec,
+            "seq": snapshot.seq,
+            "timestamp": snapshot.timestamp if snapshot else None,
+            "fever": bool(self.detector is not None and self.detector.active),
+            "fps": round(self.frame_rate.rate(), 2),
+            "refresh_rate": self.rate_controller.rate if self.rate_controller is not None else None,
+        }
+
+
+def publish_frame(sensor, frame, minHet, maxHet, timestamp, filterTime=None):
+    # Runs the sensor's temporal filter, if any, and publishes. filterTime,
+    # if given, is a histogram (anything with observe(seconds)) for the
+    # filter stage.
+    raw = None
+    if sensor.filter is not None:
+        filtered = time.perf_counter()
+        raw, frame = frame, sensor.filter.apply(frame)
+        minHet, maxHet = float(frame.min()), float(frame.max())
+        if filterTime is not None:
+            filterTime.observe(time.perf_counter() - filtered)
+    snapshot = sensor.frame_store.publish(frame, minHet, maxHet, timestamp, raw)
+    sensor.frame_rate.tick()
+    return snapshot
+
+
+def parse_sensor_specs(argument):
+    # "spec[,spec...]", each an open_source spec optionally prefixed with
+    # "<id>=". Unnamed sensors are numbered by position, so a single sensor
+    # is "0" as before logs were tagged.
+    specs = []
+    for index, part in enumerate(part.strip() for part in argument.split(",")):
+        sensor_id, named, spec = part.partition("=")
+        if not named:
+            sensor_id, spec = str(index), part
+        if not sensor_id or not spec:
+            raise ValueError(f"Invalid sensor spec '{part}'")
+        if any(sensor_id == existing for existing, _ in specs):
+            raise ValueError(f"Duplicate sensor id '{sensor_id}'")
+        specs.append((sensor_id, spec))
+    return specs
+
+
+def sensors_json(sensors):
+    # Latest frame of every sensor as one JSON object keyed by id, stitched
+    # from each snapshot's cached JSON so it is serialized once per frame
+    # however many clients ask.
+    parts = [json.dumps(sensor_id).encode() + b":" + sensor.frame_store.latest().to_json()
+             for sensor_id, sensor in sensors.items()]
+    return b"{" + b",".join(parts) + b"}"
@@ -0,0 +1,173 @@
+import binascii
+import logging
+import struct
+
+import numpy as np
+
+from frame_decode import PIXEL_COUNT
+
+logger = logging.getLogger(__name__)
+
+# Binary frame sent by the sensor bridge:
+#   sync (2 bytes) | sequence (uint16) | 192 x int16 centi-degrees | crc16
+# All fields are little-endian. The CRC is CRC-16/CCITT-FALSE over the
+# sequence and pixel bytes. Dead pixels are sent as NAN_SENTINEL.
+FRAME_SYNC = b"\xa5\x5a"
+HEADER_SIZE = len(FRAME_SYNC) + 2
+PAYLOAD_SIZE = PIXEL_COUNT * 2
+FRAME_SIZE = HEADER_SIZE + PAYLOAD_SIZE + 2
+NAN_SENTINEL = -32768
+
+MODE_AUTO = "auto"
+MODE_BINARY = "binary"
+MODE_CSV = "csv"
+
+# Give up on binary and re-detect the link after this many bad frames in a row.
+MAX_CONSECUTIVE_ERRORS = 8
+DETECT_WINDOW = 8192
+
+
+def crc16(data):
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def encode_frame(seq, frame):
+    values = np.asarray(frame, dtype=np.float64)
+    dead = np.isnan(values)
+    centi = np.clip(np.round(np.where(dead, 0, values) * 100), NAN_SENTINEL + 1, 32767)
+    centi = centi.astype("<i2")
+    centi[dead] = NAN_SENTINEL
+    body = struct.pack("<H", seq & 0xFFFF) + centi.tobytes()
+    return FRAME_SYNC + body + struct.pack("<H", crc16(body))
+
+
+class SerialFrameReader:
+    def __init__(self, handle, mode=MODE_AUTO):
+        self.handle = handle
+        self.mode = mode
+        self.detected = None if mode == MODE_AUTO else mode
+        self.buffer = bytearray(FRAME_SIZE)
+        self.view = memoryview(self.buffer)
+        self.lastSeq = None
+        self.consecutiveErrors = 0
+        self.stats = {
+            "frames": 0,
+            "crc_errors": 0,
+            "resyncs": 0,
+            "skipped_bytes": 0,
+            "lost_frames": 0,
+            "timeouts": 0,
+        }
+
+    def read(self):
+        if self.detected == MODE_BINARY:
+            return self.binaryRead()
+        if self.detected == MODE_CSV:
+            return self.csvRead()
+        return self.detect()
+
+    def detect(self):
+        # Scan the stream until either a binary frame passes its CRC or a
+        # complete CSV line shows up, then stick with that protocol.
+        line = bytearray()
+        lineStart = False
+        for _ in range(DETECT_WINDOW):
+            byte = self.handle.read(1)
+            if not byte:
+                self.stats["timeouts"] += 1
+                return []
+            if line[-1:] == FRAME_SYNC[:1] and byte == FRAME_SYNC[1:]:
+                frame = self.readBody()
+                if len(frame):
+                    logger.info("Serial link is sending binary frames.")
+                    self.detected = MODE_BINARY
+                    return frame
+                line.clear()
+                continue
+            line += byte
+            if line.endswith(b"\r\n"):
+                # The first line may have started mid-frame, so only trust
+                # a line that began right after a terminator.
+                if lineStart and line.count(b",") >= PIXEL_COUNT:
+                    logger.info("Serial link is sending CSV frames.")
+                    self.detected = MODE_CSV
+                    return self.csvParse(bytes(line))
+                lineStart = True
+                line.clear()
+        self.stats["skipped_bytes"] += DETECT_WINDOW
+        return []
+
+    def csvRead(self):
+        return self.csvParse(self.handle.read_until(terminator=b'\r\n'))
+
+    def csvParse(self, hetData):
+        hetData = str(hetData, encoding="utf8", errors="replace").split(",")
+        hetData = hetData[:-1]
+        return hetData
+
+    def binaryRead(self):
+        if not self.sync():
+            return []
+        return self.readBody()
+
+    def sync(self):
+        skipped = 0
+        matched = 0
+        while matched < len(FRAME_SYNC):
+            byte = self.handle.read(1)
+            if not byte:
+                self.stats["timeouts"] += 1
+                return False
+            if byte[0] == FRAME_SYNC[matched]:
+                matched += 1
+            else:
+                skipped += matched + 1
+                matched = 1 if byte[0] == FRAME_SYNC[0] else 0
+                skipped -= matched
+                if skipped > 2 * FRAME_SIZE:
+                    self.stats["resyncs"] += 1
+                    self.stats["skipped_bytes"] += skipped
+                    self.frameError()
+                    return False
+        if skipped:
+            self.stats["resyncs"] += 1
+            self.stats["skipped_bytes"] += skipped
+        return True
+
+    def readBody(self):
+        start = len(FRAME_SYNC)
+        self.buffer[:start] = FRAME_SYNC
+        received = self.handle.readinto(self.view[start:])
+        if received != FRAME_SIZE - start:
+            self.stats["timeouts"] += 1
+            return self.frameError()
+
+        body = self.view[start:FRAME_SIZE - 2]
+        (crc,) = struct.unpack_from("<H", self.buffer, FRAME_SIZE - 2)
+        if crc16(body) != crc:
+            self.stats["crc_errors"] += 1
+            return self.frameError()
+
+        (seq,) = struct.unpack_from("<H", self.buffer, start)
+        if self.lastSeq is not None:
+            gap = (seq - self.lastSeq - 1) & 0xFFFF
+            if gap < 0x8000:
+                self.stats["lost_frames"] += gap
+        self.lastSeq = seq
+        self.consecutiveErrors = 0
+        self.stats["frames"] += 1
+
+        centi = np.frombuffer(self.buffer, dtype="<i2", count=PIXEL_COUNT, offset=HEADER_SIZE)
+        frame = centi.astype(np.float32)
+        frame /= 100
+        frame[centi == NAN_SENTINEL] = np.nan
+        return frame
+
+    def frameError(self):
+        self.consecutiveErrors += 1
+        if self.mode == MODE_AUTO and self.consecutiveErrors >= MAX_CONSECUTIVE_ERRORS:
+            logger.warning("Too many bad binary frames, re-detecting serial protocol.")
+            self.detected = None
+            self.lastSeq = None
+            self.consecutiveErrors = 0
+        return []
@@ -0,0 +1,258 @@
+import json
+import logging
+import os
+import select
+import signal
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from frame_decode import PIXEL_COUNT, decode_frame
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"THRMSHM1"
+
+# SerialFrameReader.stats keys, mirrored into the header for serial
+# sources.
+SERIAL_STATS = ("frames", "crc_errors", "resyncs", "skipped_bytes", "lost_frames", "timeouts")
+
+# Header counters are written only by the acquisition process, as is
+# fixed_rate, set once the source is open if it has no set_rate. rate is
+# the other way round: the refresh rate the main process asks for (0 for
+# the source's own).
+HEADER = np.dtype([
+    ("magic", "S8"),
+    ("capacity", "<u4"),
+    ("rate", "<f4"),
+    ("written", "<u8"),
+    ("read", "<u8"),
+    ("short", "<u8"),
+    ("rejected", "<u8"),
+    ("interpolated", "<u8"),
+    ("serial", "<u4"),
+    ("fixed_rate", "<u4"),
+] + [("serial_" + name, "<u8") for name in SERIAL_STATS])
+HEADER_SIZE = 128
+
+RECORD = np.dtype([
+    ("seq", "<u8"),
+    ("timestamp", "<f8"),
+    ("minHet", "<f4"),
+    ("maxHet", "<f4"),
+    ("decode_seconds", "<f4"),
+    ("pixels", "<f4", (PIXEL_COUNT,)),
+])
+
+
+def _attach(name):
+    # The creating process owns the block. Before Python 3.13 attaching
+    # also registers it with this process's resource tracker, which would
+    # unlink it when this process exits.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class SharedFrameRing:
+    # Decoded frames in shared memory, written by one acquisition process
+    # and read by any number of others. Each record is guarded by its
+    # sequence number: the writer zeroes it, writes the frame and then
+    # stores the new number, and a reader keeps a frame only if the number
+    # was the same before and after reading it. The writer never waits.
+    def __init__(self, name=None, capacity=64):
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=HEADER_SIZE + capacity * RECORD.itemsize)
+            self.owner = True
+        else:
+            self.shm = _attach(name)
+            self.owner = False
+        self.header = np.ndarray((1,), dtype=HEADER, buffer=self.shm.buf)
+        if self.owner:
+            self.header[0]["magic"] = MAGIC
+            self.header[0]["capacity"] = capacity
+        elif self.header[0]["magic"] != MAGIC:
+            raise ValueError(f"{name} is not a shared frame ring")
+        self.capacity = int(self.header[0]["capacity"])
+        self.records = np.ndarray((self.capacity,), dtype=RECORD, buffer=self.shm.buf, offset=HEADER_SIZE)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def written(self):
+        return int(self.header[0]["written"])
+
+    def count(self, field):
+        return int(self.header[0][field])
+
+    def increment(self, field, n=1):
+        self.header[0][field] += n
+
+    def counter(self, field):
+        # For decode_frame's interpolated counter.
+        return RingCounter(self, field)
+
+    def serial_stats(self):
+        # The serial source's stats as SerialFrameReader keeps them, or
+        # None for other sources (and once the ring is closed).
+        if self.header is None or not self.header[0]["serial"]:
+            return None
+        return {name: int(self.header[0]["serial_" + name]) for name in SERIAL_STATS}
+
+    def write(self, frame, minHet, maxHet, timestamp, decodeSeconds=0.0):
+        seq = self.written + 1
+        record = self.records[seq % self.capacity]
+        record["seq"] = 0
+        record["timestamp"] = timestamp
+        record["minHet"] = minHet
+        record["maxHet"] = maxHet
+        record["decode_seconds"] = decodeSeconds
+        record["pixels"] = frame
+        record["seq"] = seq
+        self.header[0]["written"] = seq
+        return seq
+
+    def read(self, seq, out):
+        # Copies frame `seq` into `out` and returns (timestamp, minHet,
+        # maxHet, decode seconds), or None if it has already been
+        # overwritten.
+        record = self.records[seq % self.capacity]
+        if record["seq"] != seq:
+            return None
+        timestamp = float(record["timestamp"])
+        minHet = float(record["minHet"])
+        maxHet = float(record["maxHet"])
+        decodeSeconds = float(record["decode_seconds"])
+        np.copyto(out, record["pixels"])
+        if record["seq"] != seq:
+            return None
+        return timestamp, minHet, maxHet, decodeSeconds
+
+    def close(self):
+        self.header = None
+        self.records = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class RingCounter:
+    def __init__(self, ring, field):
+        self.ring = ring
+        self.field = field
+
+    def inc(self, n=1):
+        self.ring.increment(self.field, n)
+
+
+def acquire(sensor_id, spec, protocol, ring_name, wakeup):
+    # One sensor's read and decode loop inside the acquisition process.
+    from frame_sources import open_source
+    ring = SharedFrameRing(ring_name)
+    try:
+        source = open_source(spec, protocol)
+    except Exception as e:
+        logger.error(f"Failed to open sensor {sensor_id} ({spec}): {e}")
+        return
+    header = ring.header[0]
+    interpolated = ring.counter("interpolated")
+    stats = getattr(source, "stats", None)
+    header["serial"] = stats is not None
+    header["fixed_rate"] = not hasattr(source, "set_rate")
+    appliedRate = 0.0
+    while True:
+        rate = float(header["rate"])
+        if rate and rate != appliedRate and not header["fixed_rate"]:
+            appliedRate = rate
+            try:
+                source.set_rate(rate)
+            except Exception as e:
+                logger.error(f"Failed to set sensor {sensor_id} refresh rate: {e}")
+        hetData = source.read()
+        ring.increment("read")
+        if stats is not None:
+            for name in SERIAL_STATS:
+                header["serial_" + name] = stats[name]
+        if len(hetData) < PIXEL_COUNT:
+            ring.increment("short")
+            continue
+        start = time.perf_counter()
+        decoded = decode_frame(hetData, interpolated)
+        decodeSeconds = time.perf_counter() - start
+        if decoded is None:
+            ring.increment("rejected")
+            continue
+        frame, minHet, maxHet = decoded
+        ring.write(frame, minHet, maxHet, time.time(), decodeSeconds)
+        try:
+            os.write(wakeup, b"\0")
+        except BlockingIOError:
+            # The pipe is full of wakeups the reader has not drained yet.
+            pass
+        except BrokenPipeError:
+            logger.error("Main process has gone away, stopping acquisition.")
+            os._exit(1)
+
+
+def run_acquisition(sensors, protocol):
+    # Runs in the acquisition process: a thread per sensor, each given as
+    # (sensor_id, spec, ring name, wakeup pipe fd). Nothing else runs in
+    # this interpreter, so API, database and sync work in the main process
+    # cannot hold up a read. Ctrl-C is left to the main process, which
+    # stops this one during its shutdown.
+    logging.basicConfig(level=logging.INFO)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    threads = []
+    for sensor_id, spec, ring_name, wakeup in sensors:
+        os.set_blocking(wakeup, False)
+        threads.append(threading.Thread(target=acquire, args=(sensor_id, spec, protocol, ring_name, wakeup)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def start_acquisition(sensors, protocol):
+    # Starts this file as its own interpreter, so the child imports only
+    # this module, frame_decode and frame_sources (multiprocessing's spawn
+    # would re-run the whole of the main script). sensors is a list of
+    # (sensor_id, spec, ring). Returns the process and, per sensor, the
+    # pipe that receives a byte per written frame.
+    wakeups = []
+    arguments = []
+    for sensor_id, spec, ring in sensors:
+        readFd, writeFd = os.pipe()
+        wakeups.append((readFd, writeFd))
+        arguments.append((sensor_id, spec, ring.name, writeFd))
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__),
+                                json.dumps({"sensors": arguments, "protocol": protocol})],
+                               pass_fds=[writeFd for _, writeFd in wakeups])
+    for _, writeFd in wakeups:
+        os.close(writeFd)
+    return process, [readFd for readFd, _ in wakeups]
+
+
+def wait_for_frames(wakeup, timeout):
+    # True once frames have been written since the last call, False on
+    # timeout; raises EOFError when the acquisition process has exited.
+    ready, _, _ = select.select([wakeup], [], [], timeout)
+    if not ready:
+        return False
+    # One wakeup covers every frame written so far.
+    if not os.read(wakeup, 4096):
+        raise EOFError
+    return True
+
+
+if __name__ == "__main__":
+    arguments = json.loads(sys.argv[1])
+    run_acquisition(arguments["sensors"], arguments["protocol"])
@@ -0,0 +1,216 @@
+import logging
+import threading
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, insert, inspect, text, Column, Integer, Float, DateTime, String, Table
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+logger = logging.getLogger(__name__)
+
+DATABASE_URL = "sqlite:///thermal_data.db"
+# Rows written before logs were tagged by sensor belong to the first one.
+DEFAULT_SENSOR_ID = "0"
+
+Base = declarative_base()
+
+
+def create_storage_engine(url=DATABASE_URL):
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+
+    # WAL lets the sync worker and the history queries read while rows are
+    # being written; synchronous=NORMAL is durable across crashes in WAL
+    # mode and avoids an fsync per commit.
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+    return engine
+
+
+engine = create_storage_engine()
+# One session per thread; never share ORM sessions between threads.
+Session = scoped_session(sessionmaker(bind=engine))
+
+
+class FeverLog(Base):
+    __tablename__ = "fever_log"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sensor_id = Column(String, nullable=False, default=DEFAULT_SENSOR_ID, server_default=DEFAULT_SENSOR_ID)
+    detected_at = Column(DateTime, default=datetime.utcnow, index=True)
+    min_temperature = Column(Float)
+    max_temperature = Column(Float)
+    avg_temperature = Column(Float)
+
+
+class MonitorLog(Base):
+    __tablename__ = "monitor_log"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sensor_id = Column(String, nullable=False, default=DEFAULT_SENSOR_ID, server_default=DEFAULT_SENSOR_ID)
+    logged_at = Column(DateTime, default=datetime.utcnow, index=True)
+    min_temperature = Column(Float)
+    max_temperature = Column(Float)
+    avg_temperature = Column(Float)
+
+
+class SyncCursor(Base):
+    __tablename__ = "sync_cursor"
+    table_name = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    synced_at = Column(DateTime)
+
+
+class RollupColumns:
+    bucket_start = Column(DateTime, primary_key=True)
+    frames = Column(Integer, nullable=False)
+    sum_temperature = Column(Float, nullable=False)
+    min_temperature = Column(Float)
+    max_temperature = Column(Float)
+    fever_pixels = Column(Integer, nullable=False)
+    fever_frames = Column(Integer, nullable=False)
+
+
+class Rollup1s(RollupColumns, Base):
+    __tablename__ = "rollup_1s"
+
+
+class Rollup1m(RollupColumns, Base):
+    __tablename__ = "rollup_1m"
+
+
+class Rollup1h(RollupColumns, Base):
+    __tablename__ = "rollup_1h"
+
+
+def log_row(table_name, snapshot, sensor_id=DEFAULT_SENSOR_ID):
+    # The fever_log or monitor_log table and the row to write for a
+    # snapshot, as WriteBehindBuffer.add takes them.
+    capturedAt = datetime.utcfromtimestamp(snapshot.timestamp)
+    if table_name == "fever_log":
+        table = FeverLog.__table__
+        row = {"detected_at": capturedAt}
+    else:
+        table = MonitorLog.__table__
+        row = {"logged_at": capturedAt}
+    row["sensor_id"] = sensor_id
+    row["min_temperature"] = snapshot.minHet
+    row["max_temperature"] = snapshot.maxHet
+    row["avg_temperature"] = snapshot.average()
+    return table, row
+
+
+def migrate(engine):
+    # create_all only creates missing tables, so add columns and indexes
+    # introduced since a table was created. New columns need a server default.
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                columnType = column.type.compile(engine.dialect)
+                default = column.server_default.arg
+                logger.info(f"Adding column {table.name}.{column.name}.")
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {columnType} "
+                                        f"NOT NULL DEFAULT '{default}'"))
+            existingIndexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existingIndexes:
+                    logger.info(f"Creating index {index.name}.")
+                    index.create(connection)
+
+
+def init_db(engine=engine):
+    # Run once at startup, off the main thread; nothing touches the database
+    # file before this.
+    Base.metadata.create_all(engine)
+    migrate(engine)
+
+
+class WriteBehindBuffer(threading.Thread):
+    # Collects rows from any thread and writes them with one Core
+    # executemany per target, every max_rows rows or every max_delay seconds,
+    # whichever comes first. A target is a Table (plain insert) or an insert
+    # statement such as an upsert. on_flush is called with the names of the
+    # tables that received rows.
+    def __init__(self, engine, max_rows=50, max_delay=0.5, max_pending=10000, on_flush=None):
+        super(WriteBehindBuffer, self).__init__(daemon=True)
+        self.engine = engine
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.on_flush = on_flush
+        self.lock = threading.Lock()
+        self.rows = {}
+        self.count = 0
+        self.full = threading.Event()
+        self.stopping = threading.Event()
+        self.stats = {"rows": 0, "flushes": 0, "errors": 0, "discarded": 0}
+
+    def add(self, target, row):
+        with self.lock:
+            self.rows.setdefault(target, []).append(row)
+            self.count += 1
+            if self.count >= self.max_rows:
+                self.full.set()
+
+    def run(self):
+        while not self.stopping.is_set():
+            self.full.wait(self.max_delay)
+            self.flush()
+        self.flush()
+
+    def stop(self):
+        # Writes whatever is still buffered before returning, also when the
+        # thread never got started.
+        self.stopping.set()
+        self.full.set()
+        if self.ident is None:
+            self.flush()
+        else:
+            self.join()
+
+    def flush(self):
+        with self.lock:
+            rows = self.rows
+            count = self.count
+            self.rows = {}
+            self.count = 0
+            self.full.clear()
+        if not rows:
+            return
+
+        try:
+            with self.engine.begin() as connection:
+                for target, targetRows in rows.items():
+                    statement = insert(target) if isinstance(target, Table) else target
+                    connection.execute(statement, targetRows)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Failed to write {count} buffered rows: {e}")
+            self.requeue(rows, count)
+            return
+
+        self.stats["rows"] += count
+        self.stats["flushes"] += 1
+        if self.on_flush is not None:
+            self.on_flush([getattr(target, "table", target).name for target in rows])
+
+    def requeue(self, rows, count):
+        with self.lock:
+            for target, targetRows in rows.items():
+                self.rows[target] = targetRows + self.rows.get(target, [])
+            self.count += count
+            # Keep memory bounded if the database stays unwritable.
+            while self.count > self.max_pending:
+                target = max(self.rows, key=lambda t: len(self.rows[t]))
+                del self.rows[target][0]
+                self.count -= 1
+                self.stats["discarded"] += 1
@@ -0,0 +1,99 @@
+import logging
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class SyncWorker(threading.Thread):
+    # One long-lived thread that runs sync(table_name) for every table that
+    # has been triggered. Triggers that arrive while a sync is queued or
+    # running collapse into a single follow-up run, and failures are retried
+    # with exponential backoff, so thread count and memory stay flat no
+    # matter how long the network is down.
+    def __init__(self, sync, probe_url, probe_interval=60, backoff_base=5, backoff_max=300):
+        super(SyncWorker, self).__init__(daemon=True)
+        self.sync = sync
+        self.probe_url = probe_url
+        self.probe_interval = probe_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.http = requests.Session()
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.online = None
+        self.checkedAt = 0
+        self.backoff = 0
+        self.stats = {"triggers": 0, "runs": 0, "synced": 0, "failed": 0, "probes": 0}
+
+    def trigger(self, table_name):
+        with self.lock:
+            self.pending.add(table_name)
+            self.stats["triggers"] += 1
+        self.wakeup.set()
+
+    def stop(self):
+        self.stopping.set()
+        self.wakeup.set()
+
+    def isOnline(self):
+        # A successful sync proves connectivity, so the probe only runs when
+        # the state is unknown, stale or last seen offline.
+        now = time.monotonic()
+        if self.online and now - self.checkedAt < self.probe_interval:
+            return True
+        self.stats["probes"] += 1
+        try:
+            self.http.head(self.probe_url, timeout=5).raise_for_status()
+            self.setOnline(True)
+        except requests.RequestException as e:
+            logger.warning(f"Connectivity check failed: {e}")
+            self.setOnline(False)
+        return self.online
+
+    def setOnline(self, online):
+        if online != self.online:
+            logger.info("Network is %s." % ("reachable" if online else "unreachable"))
+        self.online = online
+        self.checkedAt = time.monotonic()
+
+    def run(self):
+        while not self.stopping.is_set():
+            self.wakeup.wait()
+            with self.lock:
+                tables = self.pending
+                self.pending = set()
+                self.wakeup.clear()
+            if self.stopping.is_set():
+                break
+
+            failed = set()
+            for table_name in sorted(tables):
+                if not self.isOnline():
+                    failed.add(table_name)
+                    continue
+                self.stats["runs"] += 1
+                try:
+                    self.sync(table_name)
+                    self.stats["synced"] += 1
+                    self.setOnline(True)
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    logger.warning(f"Sync of {table_name} failed: {e}")
+                    self.online = None
+                    failed.add(table_name)
+
+            if not failed:
+                self.backoff = 0
+                continue
+
+            self.backoff = min(self.backoff * 2 or self.backoff_base, self.backoff_max)
+            logger.warning(f"Retrying sync of {', '.join(sorted(failed))} in {self.backoff}s.")
+            with self.lock:
+                self.pending |= failed
+            self.stopping.wait(self.backoff)
+            self.wakeup.set()
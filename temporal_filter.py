@@ -0,0 +1,81 @@
+import numpy as np
+
+from frame_decode import PIXEL_COUNT
+
+FILTER_EMA = "ema"
+FILTER_KALMAN = "kalman"
+FILTERS = (FILTER_EMA, FILTER_KALMAN)
+
+
+class EMAFilter:
+    # Per-pixel exponential moving average: state += alpha * (frame - state).
+    # Smaller alpha smooths more and reacts slower; at 8 fps an alpha of 0.3
+    # settles within about a second.
+    def __init__(self, alpha=0.3, pixels=PIXEL_COUNT):
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.state = np.zeros(pixels, dtype=np.float32)
+        self.delta = np.zeros(pixels, dtype=np.float32)
+        self.primed = False
+
+    def reset(self):
+        self.primed = False
+
+    def apply(self, frame):
+        # Updates the state in place and returns a copy of it: the caller
+        # publishes the result, and published frames are never written to.
+        if not self.primed:
+            np.copyto(self.state, frame)
+            self.primed = True
+        else:
+            np.subtract(frame, self.state, out=self.delta)
+            self.delta *= self.alpha
+            self.state += self.delta
+        return self.state.copy()
+
+
+class KalmanFilter:
+    # Independent scalar Kalman filter per pixel with a random-walk model:
+    # `process_noise` is how much a pixel's true temperature may drift per
+    # frame and `measurement_noise` the sensor's noise (both variances, in
+    # degrees squared). The gain adapts, so a pixel settles quickly after a
+    # reset and then smooths as much as the noise ratio allows.
+    def __init__(self, process_noise=0.01, measurement_noise=0.25, pixels=PIXEL_COUNT):
+        if process_noise <= 0 or measurement_noise <= 0:
+            raise ValueError("process_noise and measurement_noise must be positive")
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.state = np.zeros(pixels, dtype=np.float32)
+        self.variance = np.zeros(pixels, dtype=np.float32)
+        self.gain = np.zeros(pixels, dtype=np.float32)
+        self.delta = np.zeros(pixels, dtype=np.float32)
+        self.primed = False
+
+    def reset(self):
+        self.primed = False
+
+    def apply(self, frame):
+        if not self.primed:
+            np.copyto(self.state, frame)
+            self.variance.fill(self.measurement_noise)
+            self.primed = True
+            return self.state.copy()
+        self.variance += self.process_noise
+        np.add(self.variance, self.measurement_noise, out=self.gain)
+        np.divide(self.variance, self.gain, out=self.gain)
+        np.subtract(frame, self.state, out=self.delta)
+        self.delta *= self.gain
+        self.state += self.delta
+        # variance *= 1 - gain
+        np.multiply(self.variance, self.gain, out=self.delta)
+        self.variance -= self.delta
+        return self.state.copy()
+
+
+def create_filter(kind, alpha=0.3, process_noise=0.01, measurement_noise=0.25):
+    if kind == FILTER_EMA:
+        return EMAFilter(alpha)
+    if kind == FILTER_KALMAN:
+        return KalmanFilter(process_noise, measurement_noise)
+    raise ValueError(f"filter must be one of {', '.join(FILTERS)}")
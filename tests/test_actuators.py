@@ -0,0 +1,111 @@
+import pytest
+
+import actuators
+from actuators import ActuatorScheduler, MockBinNotification, MockBuzzer
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(actuators.time, "monotonic", clock)
+    return clock
+
+
+def make_scheduler(**limits):
+    return ActuatorScheduler(MockBuzzer(), MockBinNotification(), **limits)
+
+
+def test_repeats_within_debounce_are_dropped(clock):
+    scheduler = make_scheduler(debounce=1.0)
+    scheduler.handle("notify", "notify", "notify")
+    clock.now += 0.5
+    scheduler.handle("notify", "notify", "notify")
+    assert scheduler.notifier.sent == ["notify"]
+    assert scheduler.stats["debounced"] == 1
+
+    clock.now += 0.5
+    scheduler.handle("notify", "notify", "notify")
+    assert scheduler.notifier.sent == ["notify", "notify"]
+
+
+def test_debounce_is_per_command(clock):
+    scheduler = make_scheduler(debounce=1.0)
+    scheduler.handle("notify", "start", "start")
+    scheduler.handle("notify", "notify", "notify")
+    assert scheduler.notifier.sent == ["start", "notify"]
+
+
+def test_rate_limit_per_window(clock):
+    scheduler = make_scheduler(debounce=0, rate_limit=3, rate_window=60)
+    for _ in range(5):
+        scheduler.handle("notify", "notify", "notify")
+        clock.now += 1
+    assert len(scheduler.notifier.sent) == 3
+    assert scheduler.stats["rate_limited"] == 2
+
+    # The first run leaves the window 60 s after it happened.
+    clock.now = 1060.0
+    scheduler.handle("notify", "notify", "notify")
+    assert len(scheduler.notifier.sent) == 4
+
+
+def test_pattern_timing(clock):
+    scheduler = make_scheduler()
+    start = clock.now
+    scheduler.handle("buzz", "fever", ((0.5, 0.25), (1.0, 0.0)))
+    for step in (0.0, 0.25, 0.5, 0.75, 1.0, 1.5, 1.75, 2.0):
+        clock.now = start + step
+        scheduler.fireDue()
+    assert scheduler.buzzer.events == [(start, True), (start + 0.5, False),
+                                       (start + 0.75, True), (start + 1.75, False)]
+    assert not scheduler.timers
+
+
+def test_new_pattern_replaces_the_playing_one(clock):
+    scheduler = make_scheduler(debounce=0)
+    start = clock.now
+    scheduler.handle("buzz", "fever", ((1.0, 0.0),))
+    scheduler.fireDue()
+    clock.now = start + 0.5
+    scheduler.handle("buzz", "startup", ((0.25, 0.0),))
+    scheduler.fireDue()
+    clock.now = start + 1.0
+    scheduler.fireDue()
+    # The first pattern's "off" at 1.0 s is stale; the second one's came
+    # at 0.75 s.
+    assert scheduler.buzzer.events == [(start, True), (start + 1.0, False)]
+    assert not scheduler.buzzing
+
+
+def test_configure_applies_new_limits(clock):
+    scheduler = make_scheduler(debounce=10)
+    scheduler.handle("configure", "limits", (0, 1, 60))
+    scheduler.handle("notify", "notify", "notify")
+    scheduler.handle("notify", "notify", "notify")
+    assert scheduler.notifier.sent == ["notify"]
+    assert scheduler.stats["rate_limited"] == 1
+
+
+def test_full_queue_drops_commands():
+    scheduler = ActuatorScheduler(MockBuzzer(), MockBinNotification(), max_pending=2)
+    for _ in range(3):
+        scheduler.notify("notify")
+    assert scheduler.stats["dropped"] == 1
+
+
+def test_stop_switches_the_buzzer_off():
+    scheduler = make_scheduler()
+    scheduler.start()
+    scheduler.buzz("fever", ((30.0, 0.0),))
+    scheduler.notify("notify")
+    scheduler.stop()
+    assert [on for _, on in scheduler.buzzer.events] == [True, False]
+    assert scheduler.notifier.sent == ["notify"]
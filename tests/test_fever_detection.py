@@ -0,0 +1,104 @@
+import numpy as np
+
+from fever_detection import CLEAR, FEVER, FeverDetector
+from frame_decode import PIXEL_COUNT
+from frame_store import FrameStore
+
+THRESHOLD = 40.0
+
+
+class Feed:
+    # Publishes frames with a given hottest pixel, one per second, into a
+    # store watched by the detector, and records its events.
+    def __init__(self, **settings):
+        self.events = []
+        self.detector = FeverDetector(THRESHOLD, on_event=lambda event: self.events.append(
+            (event.kind, event.snapshot.timestamp)), **settings)
+        self.store = FrameStore()
+        self.store.add_listener(self.detector.process)
+        self.now = 0.0
+
+    def frames(self, *maxima):
+        for maxHet in maxima:
+            frame = np.full(PIXEL_COUNT, 30.0, dtype=np.float32)
+            frame[0] = maxHet
+            self.now += 1
+            self.store.publish(frame, 30.0, maxHet, self.now)
+        return self
+
+    @property
+    def kinds(self):
+        return [kind for kind, _ in self.events]
+
+
+def test_alarm_needs_persistent_frames():
+    feed = Feed(persistence=3).frames(41, 41)
+    assert not feed.detector.active
+    feed.frames(41)
+    assert feed.detector.active
+    assert feed.events == [(FEVER, 3.0)]
+
+
+def test_a_cool_frame_resets_persistence():
+    feed = Feed(persistence=3).frames(41, 41, 39, 41, 41)
+    assert feed.events == []
+    feed.frames(41)
+    assert feed.kinds == [FEVER]
+
+
+def test_exactly_at_threshold_is_not_hot():
+    feed = Feed(persistence=1).frames(THRESHOLD)
+    assert not feed.detector.active
+
+
+def test_clear_needs_frames_below_the_hysteresis_band():
+    feed = Feed(persistence=1, clear_frames=3, hysteresis=0.5).frames(41)
+    # Inside the band: below the threshold but not cool enough to count.
+    feed.frames(39.8, 39.8, 39.8, 39.8)
+    assert feed.detector.active
+    feed.frames(39.5, 39.5)
+    assert feed.detector.active
+    feed.frames(39.5)
+    assert not feed.detector.active
+    assert feed.kinds == [FEVER, CLEAR]
+    assert feed.detector.stats["clears"] == 1
+
+
+def test_a_warm_frame_resets_the_clear_count():
+    feed = Feed(persistence=1, clear_frames=3, hysteresis=0.5).frames(41, 39, 39, 39.8, 39, 39)
+    assert feed.detector.active
+    feed.frames(39)
+    assert not feed.detector.active
+
+
+def test_alarm_repeats_every_cooldown_while_hot():
+    feed = Feed(persistence=1, cooldown=5).frames(*[41] * 12)
+    assert feed.events == [(FEVER, 1.0), (FEVER, 6.0), (FEVER, 11.0)]
+
+
+def test_cooldown_holds_across_a_clear():
+    feed = Feed(persistence=1, clear_frames=1, cooldown=10).frames(41, 39, 41)
+    assert feed.kinds == [FEVER, CLEAR]
+    assert feed.detector.active
+    assert feed.detector.stats["suppressed"] == 1
+    feed.frames(39, *[41] * 8)
+    assert feed.events[-1] == (FEVER, 11.0)
+
+
+def test_configure_applies_on_the_next_frame_and_keeps_state():
+    feed = Feed(persistence=1).frames(41)
+    feed.detector.configure(42.0, 2, 1, 0.0, 30.0)
+    assert feed.detector.threshold == THRESHOLD
+    # 41.5 is cool under the new threshold, and the fever it clears is the
+    # one raised before the change.
+    feed.frames(41.5)
+    assert feed.detector.threshold == 42.0
+    assert feed.kinds == [FEVER, CLEAR]
+
+
+def test_restored_frame_is_ignored():
+    feed = Feed(persistence=1)
+    frame = np.full(PIXEL_COUNT, 45.0, dtype=np.float32)
+    feed.store.restore(frame, 45.0, 45.0, 1.0)
+    feed.detector.process(feed.store.latest())
+    assert feed.events == []
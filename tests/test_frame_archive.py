@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from frame_archive import FrameArchive
+from frame_decode import PIXEL_COUNT
+from frame_store import FrameStore
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return FrameArchive(str(tmp_path / "frames.ring"), 10, "float32")
+
+
+def fill(archive, timestamps):
+    store = FrameStore()
+    store.add_listener(archive.append)
+    frame = np.full(PIXEL_COUNT, 30.0, dtype=np.float32)
+    for timestamp in timestamps:
+        store.publish(frame, 30.0, 30.0, timestamp)
+
+
+def test_read_limit_spans_the_wrap(archive):
+    fill(archive, range(100, 115))
+    assert list(archive.read(limit=7)["seq"]) == list(range(6, 13))
+    assert list(archive.read(108, None, limit=3)["seq"]) == [9, 10, 11]
+    assert len(archive.read()) == 10
+
+
+def test_select_after_the_clock_steps_back(archive):
+    fill(archive, [100, 101, 102, 50, 51, 103])
+    assert list(archive.read(101, 104)["seq"]) == [2, 3, 6]
+    assert list(archive.read(50, 52)["seq"]) == [4, 5]
+    # Sorted again once the step has been overwritten.
+    fill(archive, range(200, 210))
+    assert archive.written >= archive.header[0]["unsorted_until"]
+    assert list(archive.read(205, None)["seq"]) == [6, 7, 8, 9, 10]
+
+
+def test_untracked_archive_is_scanned_once(tmp_path, monkeypatch):
+    path = str(tmp_path / "frames.ring")
+    archive = FrameArchive(path, 10, "float32")
+    fill(archive, [100, 101, 50, 102])
+    # As an archive from before ordering was tracked.
+    archive.header[0]["unsorted_until"] = 0
+    archive.header[0]["flags"] = 0
+    archive.flush()
+
+    reopened = FrameArchive(path, 10, "float32")
+    assert reopened.header[0]["unsorted_until"] == 14
+    assert list(reopened.read(100, None)["seq"]) == [1, 2, 4]
+
+    monkeypatch.setattr(FrameArchive, "sorted", lambda self, ordered: pytest.fail("scanned again"))
+    FrameArchive(path, 10, "float32")
+
+
+def test_filtered_frames_are_archived_raw(tmp_path):
+    archive = FrameArchive(str(tmp_path / "frames.ring"), 10)
+    raw = np.full(PIXEL_COUNT, 30.0, dtype=np.float32)
+    raw[5] = 45.0
+    filtered = np.full(PIXEL_COUNT, 31.0, dtype=np.float32)
+    archive.append(FrameStore().publish(filtered, 31.0, 31.0, 100.0, raw))
+    record = archive.last()
+    assert record["maxHet"] == 45.0
+    assert record["minHet"] == 30.0
+    np.testing.assert_array_equal(record["pixels"], np.round(raw * 100).astype(np.int16))
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from frame_codec import (FLAG_DELTA, FLAG_FLOAT32, FORMAT_FLOAT32, HEADER, centi_frame, decode, encode_delta,
+                         encode_keyframe)
+from frame_decode import PIXEL_COUNT
+from frame_store import FrameStore
+
+
+def publish(store, frame, timestamp=1000.0):
+    frame = np.asarray(frame, dtype=np.float32)
+    return store.publish(frame, float(frame.min()), float(frame.max()), timestamp)
+
+
+def test_int16_keyframe_round_trip():
+    frame = np.linspace(20, 45, PIXEL_COUNT)
+    snapshot = publish(FrameStore(), frame, 1234.5)
+    header, pixels = decode(encode_keyframe(snapshot))
+    assert header["seq"] == snapshot.seq
+    assert header["flags"] == 0
+    assert header["timestamp"] == 1234.5
+    assert header["minHet"] == pytest.approx(20)
+    assert header["maxHet"] == pytest.approx(45)
+    np.testing.assert_allclose(pixels / 100, frame, atol=0.005)
+
+
+def test_float32_keyframe_round_trip():
+    frame = np.linspace(20, 45, PIXEL_COUNT)
+    snapshot = publish(FrameStore(), frame)
+    payload = encode_keyframe(snapshot, FORMAT_FLOAT32)
+    assert len(payload) == HEADER.size + PIXEL_COUNT * 4
+    header, pixels = decode(payload)
+    assert header["flags"] == FLAG_FLOAT32
+    np.testing.assert_array_equal(pixels, frame.astype(np.float32))
+
+
+def test_delta_applies_to_the_base_frame():
+    store = FrameStore()
+    base = publish(store, np.full(PIXEL_COUNT, 30.0))
+    changed = np.full(PIXEL_COUNT, 30.0)
+    changed[:10] += 1.27
+    changed[10:20] -= 1.27
+    snapshot = publish(store, changed)
+
+    payload = encode_delta(snapshot, base)
+    assert len(payload) == HEADER.size + PIXEL_COUNT
+    header, pixels = decode(payload, centi_frame(base))
+    assert header["flags"] == FLAG_DELTA
+    assert header["base"] == base.seq
+    np.testing.assert_array_equal(pixels, centi_frame(snapshot))
+
+
+def test_large_change_falls_back_to_a_keyframe():
+    store = FrameStore()
+    base = publish(store, np.full(PIXEL_COUNT, 30.0))
+    changed = np.full(PIXEL_COUNT, 30.0)
+    changed[0] = 31.5
+    snapshot = publish(store, changed)
+
+    payload = encode_delta(snapshot, base)
+    assert payload == encode_keyframe(snapshot)
+    header, pixels = decode(payload)
+    assert not header["flags"] & FLAG_DELTA
+    np.testing.assert_array_equal(pixels, centi_frame(snapshot))
+
+
+def test_delta_without_its_base_is_rejected():
+    store = FrameStore()
+    base = publish(store, np.full(PIXEL_COUNT, 30.0))
+    snapshot = publish(store, np.full(PIXEL_COUNT, 30.5))
+    with pytest.raises(ValueError):
+        decode(encode_delta(snapshot, base))
+
+
+def test_wrong_magic_is_rejected():
+    snapshot = publish(FrameStore(), np.full(PIXEL_COUNT, 30.0))
+    payload = bytearray(encode_keyframe(snapshot))
+    payload[:2] = b"XX"
+    with pytest.raises(ValueError):
+        decode(bytes(payload))
+
+
+def test_encodings_are_cached_per_snapshot_and_base():
+    store = FrameStore()
+    first = publish(store, np.full(PIXEL_COUNT, 30.0))
+    second = publish(store, np.full(PIXEL_COUNT, 30.1))
+    snapshot = publish(store, np.full(PIXEL_COUNT, 30.2))
+    assert encode_keyframe(snapshot) is encode_keyframe(snapshot)
+    assert encode_delta(snapshot, first) is encode_delta(snapshot, first)
+    assert encode_delta(snapshot, first) != encode_delta(snapshot, second)
+
+
+def test_centi_frame_saturates():
+    frame = np.full(PIXEL_COUNT, 30.0)
+    frame[0] = 400.0
+    frame[1] = -400.0
+    centi = centi_frame(publish(FrameStore(), frame))
+    assert centi[0] == 32767
+    assert centi[1] == -32768
+    assert not centi.flags.writeable
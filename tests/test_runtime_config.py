@@ -0,0 +1,95 @@
+import pytest
+
+from heatmap import MAX_BLUR
+from runtime_config import RELOADABLE, reloadable_config, validate_config
+
+CONFIG = {
+    "serial_port": "/dev/ttyUSB0",
+    "temperature_threshold": 40.6,
+    "check_interval": 30,
+    "buzzer_duration": 2.5,
+    "min_hue": 180,
+    "max_hue": 360,
+    "fever_persistence_frames": 3,
+    "fever_clear_frames": 8,
+    "fever_hysteresis": 0.5,
+    "fever_cooldown": 30,
+    "actuator_debounce": 1.0,
+    "actuator_rate_limit": 6,
+    "actuator_rate_window": 60,
+    "decode_batch_ms": 5,
+    "heatmap_scale": 20,
+    "heatmap_max_scale": 40,
+    "heatmap_blur": 0.6,
+}
+
+
+def test_changes_are_applied_to_a_copy():
+    updated = validate_config({"temperature_threshold": 39.5, "fever_persistence_frames": 5.0}, CONFIG)
+    assert updated["temperature_threshold"] == 39.5
+    assert updated["fever_persistence_frames"] == 5
+    assert isinstance(updated["fever_persistence_frames"], int)
+    assert CONFIG["temperature_threshold"] == 40.6
+
+
+@pytest.mark.parametrize("key", sorted(RELOADABLE))
+def test_every_reloadable_setting_is_in_the_config(key):
+    assert key in CONFIG
+
+
+@pytest.mark.parametrize("changes", [
+    {"temperature_threshold": 29.9},
+    {"temperature_threshold": 45.1},
+    {"min_hue": -1},
+    {"max_hue": 361},
+    {"fever_persistence_frames": 0},
+    {"fever_persistence_frames": 2.5},
+    {"heatmap_blur": -0.1},
+    {"heatmap_blur": MAX_BLUR + 0.1},
+    {"check_interval": "30"},
+    {"buzzer_duration": True},
+])
+def test_out_of_range_or_mistyped_values_are_rejected(changes):
+    with pytest.raises(ValueError):
+        validate_config(changes, CONFIG)
+
+
+def test_blur_bound_matches_the_image_route():
+    assert validate_config({"heatmap_blur": MAX_BLUR}, CONFIG)["heatmap_blur"] == MAX_BLUR
+    with pytest.raises(ValueError, match=f"between 0 and {MAX_BLUR}"):
+        validate_config({"heatmap_blur": 6}, CONFIG)
+
+
+def test_hues_must_stay_in_order():
+    with pytest.raises(ValueError, match="min_hue must be below max_hue"):
+        validate_config({"min_hue": 360}, CONFIG)
+    with pytest.raises(ValueError, match="min_hue must be below max_hue"):
+        validate_config({"min_hue": 200, "max_hue": 200}, CONFIG)
+    # Checked after every change is applied, so swapping both works.
+    updated = validate_config({"min_hue": 0, "max_hue": 120}, CONFIG)
+    assert (updated["min_hue"], updated["max_hue"]) == (0, 120)
+
+
+def test_scale_is_bounded_by_heatmap_max_scale():
+    assert validate_config({"heatmap_scale": 40}, CONFIG)["heatmap_scale"] == 40
+    with pytest.raises(ValueError, match="at most 40"):
+        validate_config({"heatmap_scale": 41}, CONFIG)
+
+
+def test_restart_only_and_unknown_settings_are_rejected():
+    with pytest.raises(ValueError, match="restart"):
+        validate_config({"serial_port": "/dev/ttyUSB1"}, CONFIG)
+    with pytest.raises(ValueError, match="Unknown"):
+        validate_config({"no_such_setting": 1}, CONFIG)
+    with pytest.raises(ValueError):
+        validate_config([("min_hue", 0)], CONFIG)
+
+
+def test_a_bad_change_applies_nothing():
+    with pytest.raises(ValueError):
+        validate_config({"temperature_threshold": 39.0, "heatmap_blur": 6}, CONFIG)
+    assert CONFIG["temperature_threshold"] == 40.6
+
+
+def test_reloadable_config_lists_only_reloadable_settings():
+    assert set(reloadable_config(CONFIG)) == set(RELOADABLE)
@@ -0,0 +1,128 @@
+import io
+
+import numpy as np
+import pytest
+
+from frame_decode import PIXEL_COUNT
+from serial_protocol import (FRAME_SIZE, MAX_CONSECUTIVE_ERRORS, MODE_AUTO, MODE_BINARY, MODE_CSV,
+                             SerialFrameReader, encode_frame)
+
+
+class FakeSerial(io.BytesIO):
+    # Enough of pyserial's Serial for SerialFrameReader; reading past the
+    # end behaves like a timeout.
+    def read_until(self, terminator=b"\n"):
+        data = bytearray()
+        while not data.endswith(terminator):
+            byte = self.read(1)
+            if not byte:
+                break
+            data += byte
+        return bytes(data)
+
+
+def frame_values(offset=0.0):
+    return np.round(np.linspace(20, 45, PIXEL_COUNT) + offset, 2)
+
+
+def csv_line(values):
+    return ("".join(f"{value:.2f}," for value in values) + "\r\n").encode()
+
+
+def test_binary_frame_round_trip():
+    values = frame_values()
+    values[7] = np.nan
+    reader = SerialFrameReader(FakeSerial(encode_frame(1, values)), MODE_BINARY)
+    frame = reader.read()
+    assert frame.dtype == np.float32
+    assert np.isnan(frame[7])
+    np.testing.assert_allclose(np.delete(frame, 7), np.delete(values, 7), atol=0.005)
+    assert reader.stats["frames"] == 1
+
+
+def test_auto_detects_binary_after_garbage():
+    stream = b"\x00\x13\xa5garbage" + encode_frame(1, frame_values()) + encode_frame(2, frame_values(1))
+    reader = SerialFrameReader(FakeSerial(stream))
+    assert len(reader.read()) == PIXEL_COUNT
+    assert reader.detected == MODE_BINARY
+    np.testing.assert_allclose(reader.read(), frame_values(1), atol=0.005)
+    assert reader.stats["frames"] == 2
+
+
+def test_auto_detects_csv_skipping_the_partial_first_line():
+    values = frame_values()
+    stream = b"12,34.5,\r\n" + csv_line(values) + csv_line(values + 1)
+    reader = SerialFrameReader(FakeSerial(stream))
+    first = reader.read()
+    assert reader.detected == MODE_CSV
+    assert len(first) == PIXEL_COUNT
+    assert float(first[0]) == pytest.approx(values[0])
+    second = reader.read()
+    assert float(second[-1]) == pytest.approx(values[-1] + 1)
+
+
+def test_crc_error_is_counted_and_skipped():
+    bad = bytearray(encode_frame(1, frame_values()))
+    bad[10] ^= 0xFF
+    reader = SerialFrameReader(FakeSerial(bytes(bad) + encode_frame(2, frame_values())), MODE_BINARY)
+    assert len(reader.read()) == 0
+    assert reader.stats["crc_errors"] == 1
+    assert len(reader.read()) == PIXEL_COUNT
+
+
+def test_sequence_gaps_count_lost_frames():
+    stream = b"".join(encode_frame(seq, frame_values()) for seq in (1, 2, 5, 0xFFFE, 0xFFFF, 1))
+    reader = SerialFrameReader(FakeSerial(stream), MODE_BINARY)
+    for _ in range(6):
+        assert len(reader.read()) == PIXEL_COUNT
+    # 3 and 4, then 0 across the wrap. 5 -> 0xFFFE is too far ahead to be
+    # a gap; the bridge restarted.
+    assert reader.stats["lost_frames"] == 3
+
+
+def test_backwards_sequence_is_not_a_loss():
+    stream = b"".join(encode_frame(seq, frame_values()) for seq in (10, 3))
+    reader = SerialFrameReader(FakeSerial(stream), MODE_BINARY)
+    reader.read()
+    reader.read()
+    assert reader.stats["lost_frames"] == 0
+
+
+def test_resync_counts_skipped_bytes():
+    stream = encode_frame(1, frame_values()) + b"noise" + encode_frame(2, frame_values())
+    reader = SerialFrameReader(FakeSerial(stream), MODE_BINARY)
+    reader.read()
+    assert len(reader.read()) == PIXEL_COUNT
+    assert reader.stats["resyncs"] == 1
+    assert reader.stats["skipped_bytes"] == len(b"noise")
+
+
+def test_timeouts():
+    reader = SerialFrameReader(FakeSerial(b""), MODE_BINARY)
+    assert len(reader.read()) == 0
+    truncated = SerialFrameReader(FakeSerial(encode_frame(1, frame_values())[:FRAME_SIZE // 2]), MODE_BINARY)
+    assert len(truncated.read()) == 0
+    assert reader.stats["timeouts"] == 1
+    assert truncated.stats["timeouts"] == 1
+
+
+def test_redetects_after_repeated_bad_frames():
+    bad = bytearray(encode_frame(1, frame_values()))
+    bad[10] ^= 0xFF
+    stream = encode_frame(0, frame_values()) + bytes(bad) * MAX_CONSECUTIVE_ERRORS
+    reader = SerialFrameReader(FakeSerial(stream), MODE_AUTO)
+    reader.read()
+    assert reader.detected == MODE_BINARY
+    for _ in range(MAX_CONSECUTIVE_ERRORS):
+        reader.read()
+    assert reader.detected is None
+    assert reader.lastSeq is None
+
+
+def test_fixed_binary_mode_never_redetects():
+    bad = bytearray(encode_frame(1, frame_values()))
+    bad[10] ^= 0xFF
+    reader = SerialFrameReader(FakeSerial(bytes(bad) * MAX_CONSECUTIVE_ERRORS), MODE_BINARY)
+    for _ in range(MAX_CONSECUTIVE_ERRORS):
+        reader.read()
+    assert reader.detected == MODE_BINARY